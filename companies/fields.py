@@ -0,0 +1,25 @@
+from django.db import models
+
+
+class ZeroPaddedField(models.TextField):
+    def __init__(self, *args, width, **kwargs):
+        self.width = width
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['width'] = self.width
+
+        return name, path, args, kwargs
+
+    def pad(self, value):
+        if value is None:
+            return value
+
+        return str(value).zfill(self.width)
+
+    def from_db_value(self, value, expression, connection):
+        return self.pad(value)
+
+    def to_python(self, value):
+        return self.pad(value)
@@ -1,10 +1,12 @@
 from django.db   import models
 from django.urls import reverse
 
+from .fields import ZeroPaddedField
+
 
 class Companies(models.Model):
     rowid          = models.IntegerField()
-    cnpj           = models.TextField(primary_key=True)
+    cnpj           = ZeroPaddedField(primary_key=True, width=8)
     corporate_name = models.TextField(blank=True, null=True)
     capital        = models.IntegerField(blank=True, null=True)
 
@@ -44,13 +46,13 @@ class Partners(models.Model):
 class Business(models.Model):
     rowid        = models.IntegerField(primary_key=True)
     cnpj         = models.ForeignKey('Companies', models.DO_NOTHING, db_column='cnpj')
-    cnpj_order   = models.TextField()
-    cnpj_dv      = models.TextField()
+    cnpj_order   = ZeroPaddedField(width=4)
+    cnpj_dv      = ZeroPaddedField(width=2)
     branch       = models.BooleanField(blank=True, null=True)
     trade_name   = models.TextField(blank=True, null=True)
     closing_date = models.DateField(blank=True, null=True)
     opening_date = models.DateField(blank=True, null=True)
-    cep          = models.TextField(blank=True, null=True)
+    cep          = ZeroPaddedField(blank=True, null=True, width=8)
 
     class Meta:
         managed  = False
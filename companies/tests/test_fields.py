@@ -0,0 +1,27 @@
+import unittest
+
+from companies.models import Companies, \
+                             Business
+
+
+class TestZeroPaddedField(unittest.TestCase):
+    def setUp(self):
+        self.cnpj = Companies._meta.get_field('cnpj')
+        self.cep  = Business ._meta.get_field('cep' )
+
+    def test_integer_keys_are_padded_from_db(self):
+        self.assertEqual(self.cnpj.from_db_value(33500091, None, None), '33500091')
+        self.assertEqual(self.cnpj.from_db_value(123     , None, None), '00000123')
+        self.assertEqual(self.cep .from_db_value(1001000 , None, None), '01001000')
+
+    def test_text_keys_are_unchanged(self):
+        self.assertEqual(self.cnpj.from_db_value('00000123', None, None), '00000123')
+        self.assertIsNone(self.cep.from_db_value(None, None, None))
+
+    def test_lookup_values_are_padded(self):
+        self.assertEqual(self.cnpj.get_prep_value(123       ), '00000123')
+        self.assertEqual(self.cnpj.get_prep_value('00000123'), '00000123')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -64,15 +64,32 @@ DATABASES = {
         "NAME"   : BASE_DIR / "data/sqlite/db.sqlite3",
     },
     "rfb" : {
-        "ENGINE"  : "django.db.backends.sqlite3",
-        "NAME"    : f"file:{(BASE_DIR / 'data/sqlite/rfb.sqlite3').as_posix()}?mode=ro&cache=shared",
-        "OPTIONS" : {"uri": True},
+        "ENGINE"       : "django.db.backends.sqlite3",
+        "NAME"         : f"file:{(BASE_DIR / 'data/sqlite/rfb.sqlite3').as_posix()}?mode=ro&cache=shared",
+        "OPTIONS"      : {"uri": True},
+        # rfb.sqlite3 is a symlink swapped by the loader; reopening per request picks up new snapshots
+        "CONN_MAX_AGE" : 0,
     },
 }
 
 DATABASE_ROUTERS = ["companies.router.RFBRouter"]
 
 
+# Cache
+# The summarizer cache is shared by every worker process; create it with `python manage.py createcachetable`
+
+CACHES = {
+    "default" : {
+        "BACKEND" : "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "summarizer" : {
+        "BACKEND"  : "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION" : "summarizer_cache",
+        "TIMEOUT"  : None,
+    },
+}
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
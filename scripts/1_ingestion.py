@@ -1,49 +1,149 @@
-import shutil
-from multiprocessing import Process,      \
+import argparse
+from queue           import Empty
+from multiprocessing import Lock,          \
+                            Process,       \
+                            Queue,         \
                             JoinableQueue
 
 from .io import downloader_worker, \
                 extractor_worker , \
+                report_throughput, \
+                clean_tmp_dir    , \
                 ensure_dirs
-from .constants import BASE_URL, \
-                       TMP_DIR , \
-                       DICT_DIR
+from .constants import BASE_URL        , \
+                       TMP_DIR         , \
+                       ZIP_DIR         , \
+                       DICT_DIR        , \
+                       MANIFEST_PATH   , \
+                       EXTRACTORS      , \
+                       MAX_PENDING_ZIPS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download the RFB open data files.")
+    parser.add_argument(
+        '--keep-zip'       ,
+        action='store_true',
+        help=f"keep the downloaded archives in {ZIP_DIR} instead of extracting CSVs",
+    )
+    parser.add_argument(
+        '--extractors'    ,
+        type=int          ,
+        default=EXTRACTORS,
+        help="number of extractor processes",
+    )
+    parser.add_argument(
+        '--max-pending'         ,
+        type=int                ,
+        default=MAX_PENDING_ZIPS,
+        help="downloaded archives allowed to wait for extraction before downloaders block",
+    )
+
+    return parser.parse_args()
+
+
+def drain(queue):
+    records = []
+    while True:
+        try:
+            records.append(queue.get_nowait())
+        except Empty:
+            return records
+
+
+def download_zips(stats_queue, manifest_lock):
+    ensure_dirs([ZIP_DIR])
+
+    downloaders = [
+        Process(
+            target=downloader_worker,
+            args=(
+                BASE_URL     ,
+                file_type    ,
+                10           ,
+                ZIP_DIR      ,
+                ZIP_DIR      ,
+                None         ,
+                stats_queue  ,
+                MANIFEST_PATH,
+                manifest_lock,
+            )
+        )
+        for file_type in DICT_DIR
+    ]
+
+    for downloader in downloaders:
+        downloader.start()
+
+    for downloader in downloaders:
+        downloader.join()
 
 
 def main():
+    args = parse_args()
+
+    stats_queue   = Queue()
+    manifest_lock = Lock()
+
+    if args.keep_zip:
+        download_zips(stats_queue, manifest_lock)
+        report_throughput(drain(stats_queue))
+        return
+
     ensure_dirs([TMP_DIR, *DICT_DIR.values()])
 
-    task_queue = JoinableQueue()
+    task_queue = JoinableQueue(maxsize=args.max_pending)
 
     downloaders = [
         Process(
             target=downloader_worker,
             args=(
-                BASE_URL  ,
-                file_type ,
-                10        ,
-                target_dir,
-                TMP_DIR   ,
-                task_queue,
+                BASE_URL     ,
+                file_type    ,
+                10           ,
+                target_dir   ,
+                TMP_DIR      ,
+                task_queue   ,
+                stats_queue  ,
+                MANIFEST_PATH,
+                manifest_lock,
             )
         )
         for file_type, target_dir in DICT_DIR.items()
     ]
-    extractor = Process(target=extractor_worker, args=(task_queue,))
+    extractors = [
+        Process(
+            target=extractor_worker,
+            args=(
+                task_queue   ,
+                stats_queue  ,
+                MANIFEST_PATH,
+                manifest_lock,
+            )
+        )
+        for _ in range(args.extractors)
+    ]
 
     for downloader in downloaders:
         downloader.start()
-    extractor.start()
+    for extractor in extractors:
+        extractor.start()
 
     for downloader in downloaders:
         downloader.join()
 
-    task_queue.put(None)
+    for _ in extractors:
+        task_queue.put(None)
     task_queue.join()
-    extractor .join()
+
+    for extractor in extractors:
+        extractor.join()
+
+    report_throughput(drain(stats_queue))
 
     print("Removing temporary files...")
-    shutil.rmtree(TMP_DIR)
+    for path in clean_tmp_dir(TMP_DIR):
+        print(f"[Download] Incomplete, kept to resume on the next run: {path.name}")
 
 
 if __name__ == "__main__":
@@ -1,158 +1,226 @@
-import duckdb
-import pandas as pd
-
-from .process   import csv2parquet
-from .constants import CHUNKSIZE,         \
-                       COLS_PARTNERS,     \
-                       COLS_COMPANIES,    \
-                       COLS_BUSINESS,     \
-                       NAMES_PARTNERS,    \
-                       NAMES_COMPANIES,   \
-                       NAMES_BUSINESS,    \
-                       SORT_PARTNERS,     \
-                       SORT_COMPANIES,    \
-                       SORT_BUSINESS,     \
-                       DICT_DIR,          \
-                       PARQUET_DIR,       \
-                       PARQUET_PARTNERS,  \
-                       PARQUET_COMPANIES, \
+import shutil
+import argparse
+
+from .process    import csv2parquet         , \
+                        csv2parquet_parallel, \
+                        dedupe_parquet      , \
+                        report_timings      , \
+                        ChunkSizer
+from .io         import resolve_parquet
+from .transforms import fn_partners         , \
+                        fn_companies        , \
+                        fn_business         , \
+                        load_partner_cnpjs  , \
+                        PARTITIONS_PARTNERS , \
+                        PARTITIONS_COMPANIES, \
+                        PARTITIONS_BUSINESS
+from .constants import CHUNKSIZE,            \
+                       MEMORY_BUDGET,        \
+                       COLS_PARTNERS,        \
+                       COLS_COMPANIES,       \
+                       COLS_BUSINESS,        \
+                       NAMES_PARTNERS,       \
+                       NAMES_COMPANIES,      \
+                       NAMES_BUSINESS,       \
+                       SORT_PARTNERS,        \
+                       SORT_COMPANIES,       \
+                       SORT_BUSINESS,        \
+                       SCHEMA_PARTNERS,      \
+                       SCHEMA_COMPANIES,     \
+                       SCHEMA_BUSINESS,      \
+                       PARQUET_WRITER,       \
+                       PARQUET_BLOOM_WRITER, \
+                       DICT_DIR,             \
+                       ZIP_DIR,              \
+                       PARQUET_DIR,          \
+                       PARQUET_PARTNERS,     \
+                       PARQUET_COMPANIES,    \
                        PARQUET_BUSINESS
 
 
-con = duckdb.connect()
-
-
-def fn_partners(df):
-    df.dropna(inplace=True)
-
-    df.cnpj = df.cnpj.astype(str).str.zfill(8)
-    df.start_date = pd.to_datetime(
-        df
-        .start_date
-        .astype(str)   ,
-        format="%Y%m%d",
-        errors="coerce",
+def parse_args():
+    parser = argparse.ArgumentParser(description="Transform the RFB CSV files into Parquet.")
+    parser.add_argument(
+        '--from-zip'       ,
+        action='store_true',
+        help=f"stream the CSV members straight from the archives in {ZIP_DIR}",
     )
-
-    return df
-
-
-def fn_companies(df):
-    df.cnpj = df.cnpj.astype(str).str.zfill(8)
-    df.capital = (
-        df
-        .capital
-        .str
-        .replace(r',.*', '', regex=True)
-        .astype('int64')
+    parser.add_argument(
+        '--sort'                     ,
+        choices=['chunk', 'external'],
+        default='chunk'              ,
+        help="sort each chunk on its own or globally through an external merge sort",
+    )
+    parser.add_argument(
+        '--memory-budget'                ,
+        type=float                       ,
+        default=MEMORY_BUDGET / 1024 ** 3,
+        help="memory budget in GB for the external merge sort and --adaptive chunk sizing",
+    )
+    parser.add_argument(
+        '--adaptive'       ,
+        action='store_true',
+        help="size the chunks from the memory budget and the observed bytes per row",
+    )
+    parser.add_argument(
+        '--engine'                 ,
+        choices=['pandas', 'arrow'],
+        default='pandas'           ,
+        help="CSV reader: pandas.read_csv or the multithreaded pyarrow.csv streaming reader",
+    )
+    parser.add_argument(
+        '--workers',
+        type=int   ,
+        default=1  ,
+        help="convert the ten CSV shards of each entity in a pool of worker processes",
+    )
+    parser.add_argument(
+        '--compact'        ,
+        action='store_true',
+        help="write integer keys, dictionary-encoded names and date32 columns",
+    )
+    parser.add_argument(
+        '--partitioned'    ,
+        action='store_true',
+        help="write hive-partitioned datasets (cnpj_prefix / start_year) instead of single files",
+    )
+    writer = parser.add_mutually_exclusive_group()
+    writer.add_argument(
+        '--tune-writer'    ,
+        action='store_true',
+        help="write with the row-group size and page index from PARQUET_WRITER",
+    )
+    writer.add_argument(
+        '--bloom-filters'  ,
+        action='store_true',
+        help="write through DuckDB with bloom filters on the keys in PARQUET_BLOOM_WRITER (no page index)",
+    )
+    parser.add_argument(
+        '--checkpoint'     ,
+        action='store_true',
+        help="commit every chunk to a run manifest and resume at the first uncommitted chunk",
+    )
+    parser.add_argument(
+        '--skip-dedupe'    ,
+        action='store_true',
+        help="keep companies duplicated across chunks instead of de-duplicating them by CNPJ",
     )
 
-    query = f"""
-        SELECT DISTINCT ON (cnpj) df.*
-        FROM df
-        SEMI JOIN read_parquet('{PARQUET_PARTNERS}') USING (cnpj)
-    """
-
-    return con.execute(query).df()
+    return parser.parse_args()
 
 
-def fn_business(df):
-    df.branch = df.branch.astype(str).str.strip() == '1'
+def source_paths(file_type, from_zip=False):
+    if from_zip:
+        return [
+            ZIP_DIR / f'{file_type}{i}.zip'
+            for i in range(10)
+        ]
 
-    df.cep = (
-        df
-        .cep
-        .fillna('0')
-        .astype(str)
-        .str.replace('-' , '')
-        .str.replace(r'\..*$', '', regex=True)
-        .str.zfill(8)
-    )
+    return [
+        DICT_DIR[file_type] / f'{file_type.lower()}{i}.csv'
+        for i in range(10)
+    ]
 
-    df.cnpj       = df.cnpj      .astype(str).str.zfill(8)
-    df.cnpj_order = df.cnpj_order.astype(str).str.zfill(4)
-    df.cnpj_dv    = df.cnpj_dv   .astype(str).str.zfill(2)
 
-    df.closing_date = pd.to_datetime(
-        df
-        .closing_date
-        .astype(str)   ,
-        format="%Y%m%d",
-        errors="coerce",
-    )
-    df.opening_date = pd.to_datetime(
-        df
-        .opening_date
-        .astype(str)   ,
-        format="%Y%m%d",
-        errors="coerce",
-    )
+def writer_options(args):
+    if args.bloom_filters:
+        return PARQUET_BLOOM_WRITER
 
-    query = f"""
-        SELECT df.*
-        FROM df
-        SEMI JOIN read_parquet('{PARQUET_PARTNERS}') USING (cnpj)
-    """
+    if args.tune_writer:
+        return PARQUET_WRITER
 
-    return con.execute(query).df()
+    return None
 
 
 def main():
-    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
-
-    if PARQUET_PARTNERS.exists():
-        print('Skipping partners.parquet — already exists.')
-    else:
-        paths_partners = [
-            DICT_DIR['Socios'] / f'socios{i}.csv'
-            for i in range(10)
-        ]
-
-        csv2parquet(
-            PARQUET_PARTNERS     ,
-            paths_partners       ,
-            COLS_PARTNERS        ,
-            NAMES_PARTNERS       ,
-            CHUNKSIZE            ,
-            transform=fn_partners,
-            sort_by=SORT_PARTNERS,
-        )
-
-    if PARQUET_COMPANIES.exists():
-        print('Skipping companies.parquet — already exists.')
-    else:
-        paths_companies = [
-            DICT_DIR['Empresas'] / f'empresas{i}.csv'
-            for i in range(10)
-        ]
+    args = parse_args()
 
-        csv2parquet(
-            PARQUET_COMPANIES     ,
-            paths_companies       ,
-            COLS_COMPANIES        ,
-            NAMES_COMPANIES       ,
-            CHUNKSIZE             ,
-            transform=fn_companies,
-            sort_by=SORT_COMPANIES,
-        )
-
-    if PARQUET_BUSINESS.exists():
-        print('Skipping business.parquet — already exists.')
-    else:
-        paths_business = [
-            DICT_DIR['Estabelecimentos'] / f'estabelecimentos{i}.csv'
-            for i in range(10)
-        ]
+    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
 
-        csv2parquet(
-            PARQUET_BUSINESS     ,
-            paths_business       ,
-            COLS_BUSINESS        ,
-            NAMES_BUSINESS       ,
-            CHUNKSIZE            ,
-            transform=fn_business,
-            sort_by=SORT_BUSINESS,
-        )
+    options = {
+        'sort_mode'     : args.sort                          ,
+        'memory_budget' : int(args.memory_budget * 1024 ** 3),
+        'engine'        : args.engine                        ,
+        'writer_options': writer_options(args)               ,
+        'checkpoint'    : args.checkpoint                    ,
+    }
+
+    stages = [
+        (PARQUET_PARTNERS , 'Socios'          , COLS_PARTNERS , NAMES_PARTNERS , fn_partners , SORT_PARTNERS , SCHEMA_PARTNERS , PARTITIONS_PARTNERS ),
+        (PARQUET_COMPANIES, 'Empresas'        , COLS_COMPANIES, NAMES_COMPANIES, fn_companies, SORT_COMPANIES, SCHEMA_COMPANIES, PARTITIONS_COMPANIES),
+        (PARQUET_BUSINESS , 'Estabelecimentos', COLS_BUSINESS , NAMES_BUSINESS , fn_business , SORT_BUSINESS , SCHEMA_BUSINESS , PARTITIONS_BUSINESS ),
+    ]
+
+    for parquet_path, file_type, usecols, names, transform, sort_by, schema, partitions in stages:
+        options['schema']     = schema     if args.compact     else None
+        options['partitions'] = partitions if args.partitioned else None
+
+        if args.partitioned:
+            parquet_path = parquet_path.with_suffix('')
+
+        if parquet_path.exists():
+            print(f'Skipping {parquet_path.name} — already exists.')
+            continue
+
+        if transform is not fn_partners:
+            load_partner_cnpjs()
+
+        chunksize = ChunkSizer(options['memory_budget']) \
+                    if args.adaptive                     \
+                    else CHUNKSIZE
+
+        dedupe      = transform is fn_companies and not args.skip_dedupe
+        output_path = parquet_path
+
+        if dedupe:
+            print(f"De-duplicating {parquet_path.name}: the output is sorted by cnpj, not by {', '.join(sort_by)}.")
+
+            sort_by      = None
+            parquet_path = parquet_path.with_name(f'{parquet_path.stem}.undeduped{parquet_path.suffix}')
+
+        if dedupe and args.checkpoint and resolve_parquet(parquet_path).exists():
+            print(f'Reusing {parquet_path.name} from a previous run.')
+        elif args.workers > 1:
+            csv2parquet_parallel(
+                parquet_path                          ,
+                source_paths(file_type, args.from_zip),
+                usecols                               ,
+                names                                 ,
+                chunksize                             ,
+                transform=transform                   ,
+                sort_by=sort_by                       ,
+                workers=args.workers                  ,
+                **options                             ,
+            )
+        else:
+            csv2parquet(
+                parquet_path                          ,
+                source_paths(file_type, args.from_zip),
+                usecols                               ,
+                names                                 ,
+                chunksize                             ,
+                transform=transform                   ,
+                sort_by=sort_by                       ,
+                **options                             ,
+            )
+
+        if dedupe:
+            dedupe_parquet(
+                parquet_path                            ,
+                'cnpj'                                  ,
+                schema=options['schema']                ,
+                partitions=options['partitions']        ,
+                writer_options=options['writer_options'],
+                output_path=output_path                 ,
+            )
+
+            staging = resolve_parquet(parquet_path)
+            if staging.is_dir():
+                shutil.rmtree(staging)
+            else:
+                staging.unlink(missing_ok=True)
+
+        report_timings(output_path.name)
 
 
 if __name__ == '__main__':
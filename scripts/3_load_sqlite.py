@@ -1,69 +1,86 @@
+import os
 import sqlite3
-
-from .load import insert_parquet    , \
+import argparse
+
+from .load import insert_parquet     , \
+                  configure_bulk_load, \
+                  create_tables      , \
+                  create_indexes     , \
+                  build_fts          , \
+                  versioned_path     , \
+                  build_path         , \
+                  verify_database    , \
+                  optimize_database  , \
+                  swap_database      , \
+                  prune_versions     , \
                   measure_query_time
-from .constants import SQLITE_PATH      , \
-                       PARQUET_PARTNERS , \
-                       PARQUET_COMPANIES, \
+from .constants import SQLITE_PATH       , \
+                       SQLITE_FTS        , \
+                       SQLITE_FTS_OPTIONS, \
+                       SQLITE_PAGE_SIZE  , \
+                       PARQUET_PARTNERS  , \
+                       PARQUET_COMPANIES , \
                        PARQUET_BUSINESS
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load the RFB Parquet files into SQLite.")
+    parser.add_argument(
+        '--fts-prefix'                      ,
+        default=SQLITE_FTS_OPTIONS['prefix'],
+        help="lengths of the FTS5 prefix indexes, e.g. '2 3 4' (empty to disable)",
+    )
+    parser.add_argument(
+        '--fts-tokenizer'                     ,
+        default=SQLITE_FTS_OPTIONS['tokenize'],
+        help="FTS5 tokenizer, e.g. 'unicode61 remove_diacritics 2' or 'trigram'",
+    )
+    parser.add_argument(
+        '--compact-schema' ,
+        action='store_true',
+        help="integer CNPJ keys and WITHOUT ROWID partners/business clustered on cnpj",
+    )
+
+    return parser.parse_args()
+
+
+args = parse_args()
+
+fts_options = {
+    'prefix'  : args.fts_prefix   ,
+    'tokenize': args.fts_tokenizer,
+}
+
 SQLITE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+version_path = versioned_path(SQLITE_PATH)
+tmp_path     = build_path(version_path)
+
 
 # ==========================
 # 🔌 SQLite setup and tables
 # ==========================
-print("🔌 Connecting to SQLite database and creating tables...")
+print(f"🔌 Building new SQLite snapshot at {tmp_path.name} and creating tables...")
 
-conn   = sqlite3.connect(SQLITE_PATH)
+conn   = sqlite3.connect(tmp_path)
 cursor = conn.cursor()
 
+cursor.execute(f'PRAGMA page_size = {SQLITE_PAGE_SIZE}')
 cursor.execute('PRAGMA foreign_keys = ON')
 
-cursor.execute('DROP TABLE IF EXISTS companies')
-cursor.execute('''
-    CREATE TABLE companies (
-        cnpj TEXT PRIMARY KEY,
-        corporate_name TEXT,
-        capital INTEGER
-    )
-''')
-
-cursor.execute('DROP TABLE IF EXISTS partners')
-cursor.execute('''
-    CREATE TABLE partners (
-        cnpj TEXT,
-        name_partner TEXT,
-        start_date TEXT,
-        FOREIGN KEY (cnpj) REFERENCES companies(cnpj)
-    )
-''')
-
-cursor.execute('DROP TABLE IF EXISTS business')
-cursor.execute('''
-    CREATE TABLE business (
-        cnpj TEXT,
-        cnpj_order TEXT,
-        cnpj_dv TEXT,
-        branch BOOLEAN,
-        trade_name TEXT,
-        closing_date TEXT,
-        opening_date TEXT,
-        cep TEXT,
-        PRIMARY KEY (cnpj, cnpj_order, cnpj_dv),
-        FOREIGN KEY (cnpj) REFERENCES companies(cnpj)
-    )
-''')
-
-conn.commit()
+create_tables(conn, args.compact_schema)
 
 # ===========================
 # 🚀 Load and insert all data
 # ===========================
-insert_parquet(conn, 'companies', PARQUET_COMPANIES)
-insert_parquet(conn, 'partners' , PARQUET_PARTNERS )
-insert_parquet(conn, 'business' , PARQUET_BUSINESS )
+configure_bulk_load(conn)
+cursor.execute('BEGIN')
+
+pad_keys = not args.compact_schema
+
+insert_parquet(conn, 'companies', PARQUET_COMPANIES, pad_keys=pad_keys)
+insert_parquet(conn, 'partners' , PARQUET_PARTNERS , pad_keys=pad_keys, rowid=args.compact_schema)
+insert_parquet(conn, 'business' , PARQUET_BUSINESS , pad_keys=pad_keys, rowid=args.compact_schema)
 
 conn.commit()
 
@@ -121,24 +138,11 @@ print()
 print("⚙️ Creating indexes and FTS5 virtual tables for text search...")
 print()
 
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_partners_cnpj ON partners(cnpj)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_business_cnpj ON business(cnpj)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_partners_start_date ON partners(start_date)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_business_opening_closing ON business(opening_date, closing_date)')
-
-cursor.execute('DROP TABLE IF EXISTS companies_fts')
-cursor.execute('CREATE VIRTUAL TABLE companies_fts USING fts5(corporate_name, content="companies", content_rowid="rowid")')
-cursor.execute('INSERT INTO companies_fts(rowid, corporate_name) SELECT rowid, corporate_name FROM companies')
-
-cursor.execute('DROP TABLE IF EXISTS partners_fts')
-cursor.execute('CREATE VIRTUAL TABLE partners_fts USING fts5(name_partner, content="partners", content_rowid="rowid")')
-cursor.execute('INSERT INTO partners_fts(rowid, name_partner) SELECT rowid, name_partner FROM partners')
-
-cursor.execute('DROP TABLE IF EXISTS business_fts')
-cursor.execute('CREATE VIRTUAL TABLE business_fts USING fts5(trade_name, content="business", content_rowid="rowid")')
-cursor.execute('INSERT INTO business_fts(rowid, trade_name) SELECT rowid, trade_name FROM business')
+create_indexes(conn, args.compact_schema)
+conn.close()
 
-conn.commit()
+conn   = build_fts(tmp_path, options=fts_options)
+cursor = conn.cursor()
 
 # =========================
 # ✅ Measure after indexing
@@ -187,10 +191,23 @@ measure_query_time(
     "companies.corporate_name (FTS5)"
 )
 
-# ===========
-# 🧹 Finalize
-# ===========
+# ==============================
+# 🔎 Verify, optimize and publish
+# ==============================
+print()
+print("🔎 Verifying and optimizing the new snapshot...")
+
+counts = verify_database(conn, ('companies', 'partners', 'business'))
+for table, count in counts.items():
+    print(f"  • {table}: {count:,} rows")
+
+optimize_database(conn, SQLITE_FTS)
 conn.close()
 
+os.replace(tmp_path, version_path)
+swap_database(version_path, SQLITE_PATH)
+prune_versions(SQLITE_PATH)
+
 print()
-print(f"✅ SQLite database successfully created at: {SQLITE_PATH}")
+print(f"✅ SQLite database successfully created at: {version_path}")
+print(f"🔁 {SQLITE_PATH.name} now points to {version_path.name}")
@@ -1,35 +1,50 @@
+import os
 import duckdb
 
-from .load import measure_query_time
-from .constants import DUCKDB_PATH, \
-                       DUCKDB_DIR , \
-                       SQLITE_PATH
+from .load import load_duckdb_table, \
+                  versioned_path   , \
+                  build_path       , \
+                  swap_database    , \
+                  prune_versions   , \
+                  measure_query_time
+from .aggregates import build_aggregates
+from .constants import DUCKDB_PATH      , \
+                       DUCKDB_DIR       , \
+                       PARQUET_PARTNERS , \
+                       PARQUET_COMPANIES, \
+                       PARQUET_BUSINESS
 
 
 DUCKDB_DIR.mkdir(parents=True, exist_ok=True)
 
+version_path = versioned_path(DUCKDB_PATH)
+tmp_path     = build_path(version_path)
+
 
 # ==============================
 # 🔌 DuckDB setup and connection
 # ==============================
-print("🔌 Connecting to DuckDB database...")
+print(f"🔌 Building new DuckDB snapshot at {tmp_path.name}...")
 
-conn = duckdb.connect(DUCKDB_PATH)
+conn = duckdb.connect(tmp_path)
 
-# ==================================
-# 🚀 Load data directly from SQLite
-# ==================================
+# ===================================
+# 🚀 Load data directly from Parquet
+# ===================================
 print()
-print("📥 Loading data from SQLite directly into DuckDB with automatic schema inference...")
+print("📥 Loading the Parquet files into DuckDB with an explicit typed schema...")
 
-conn.execute(f"DROP TABLE IF EXISTS companies")
-conn.execute(f"CREATE TABLE companies AS SELECT * FROM sqlite_scan('{SQLITE_PATH}', 'companies')")
+load_duckdb_table(conn, 'companies', PARQUET_COMPANIES)
+load_duckdb_table(conn, 'partners' , PARQUET_PARTNERS )
+load_duckdb_table(conn, 'business' , PARQUET_BUSINESS )
 
-conn.execute(f"DROP TABLE IF EXISTS partners")
-conn.execute(f"CREATE TABLE partners AS SELECT * FROM sqlite_scan('{SQLITE_PATH}', 'partners')")
+# ===================================
+# 📊 Precompute dashboard aggregates
+# ===================================
+print()
+print("📊 Precomputing aggregate tables for the dashboard...")
 
-conn.execute(f"DROP TABLE IF EXISTS business")
-conn.execute(f"CREATE TABLE business AS SELECT * FROM sqlite_scan('{SQLITE_PATH}', 'business')")
+build_aggregates(conn)
 
 # ============================
 # 🔍 Measure query performance
@@ -65,8 +80,15 @@ measure_query_time(
 # ==========
 # 🧹 Finish
 # ==========
+conn.execute('CHECKPOINT')
 conn.close()
 
+os.replace(tmp_path, version_path)
+swap_database(version_path, DUCKDB_PATH)
+prune_versions(DUCKDB_PATH)
+
 print()
-print(f"✅ DuckDB database successfully created at: {DUCKDB_PATH}")
+print(f"✅ DuckDB database successfully created at: {version_path}")
+print(f"🔁 {DUCKDB_PATH.name} now points to {version_path.name}")
 print("✅ Data stored in columnar format optimized for analytics.")
+print("💡 Run `python manage.py warm_dashboard_cache` to refresh the dashboard cache from the new snapshot.")
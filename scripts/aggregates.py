@@ -0,0 +1,96 @@
+DASHBOARD_QUERIES = {
+    'companies': """
+        SELECT
+            COUNT(DISTINCT cnpj)   AS total_companies,
+            MIN(capital)           AS min_capital,
+            MAX(capital)           AS max_capital,
+            ROUND(AVG(capital), 2) AS avg_capital
+        FROM companies
+    """,
+    'partners': """
+        SELECT
+            COUNT(DISTINCT name_partner) AS total_partners,
+            MIN(start_date)              AS earliest_partner_date,
+            MAX(start_date)              AS latest_partner_date
+        FROM partners
+    """,
+    'business': """
+        SELECT
+            COUNT(*)              AS total_business,
+            COUNT(DISTINCT cnpj)  AS unique_business,
+            MIN(opening_date)     AS earliest_opening,
+            MAX(opening_date)     AS latest_opening
+        FROM business
+    """,
+}
+
+
+def section_query(section, queries=DASHBOARD_QUERIES):
+    return f"SELECT {section} FROM ({queries[section]}) AS {section}"
+
+
+def dashboard_stats_query(queries=DASHBOARD_QUERIES):
+    sections = ',\n'.join(
+        f"({section_query(section, queries)}) AS {section}"
+        for section in queries
+    )
+
+    return f"SELECT {sections},\n current_timestamp AS computed_at"
+
+
+CAPITAL_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+PARTNERS_CAP      = 10
+CEP_PREFIX_LENGTH = 3
+
+ANALYTICS_COLUMNS = (
+    'capital_quantiles'   ,
+    'capital_histogram'   ,
+    'null_capital'        ,
+    'opened_per_year'     ,
+    'active_business'     ,
+    'closed_business'     ,
+    'cep_prefixes'        ,
+    'partner_distribution',
+)
+
+ANALYTICS_QUERY = f"""
+    SELECT *
+    FROM (
+        SELECT
+            quantile_cont(capital, {CAPITAL_QUANTILES})                     AS capital_quantiles,
+            histogram(CAST(floor(log10(greatest(capital, 1))) AS INTEGER))
+                FILTER (WHERE capital IS NOT NULL)                          AS capital_histogram,
+            count_if(capital IS NULL)                                       AS null_capital
+        FROM companies
+    ),
+    (
+        SELECT
+            histogram(year(CAST(opening_date AS DATE))) AS opened_per_year,
+            count_if(closing_date IS NULL)              AS active_business,
+            count_if(closing_date IS NOT NULL)          AS closed_business,
+            histogram(left(cep, {CEP_PREFIX_LENGTH}))   AS cep_prefixes
+        FROM business
+    ),
+    (
+        SELECT histogram(least(partners, {PARTNERS_CAP})) AS partner_distribution
+        FROM (
+            SELECT COUNT(partners.cnpj) AS partners
+            FROM companies
+            LEFT JOIN partners USING (cnpj)
+            GROUP BY companies.cnpj
+        )
+    )
+"""
+
+
+AGGREGATES = {
+    'dashboard_stats'    : dashboard_stats_query(),
+    'dashboard_analytics': ANALYTICS_QUERY        ,
+}
+
+
+def build_aggregates(conn, aggregates=AGGREGATES):
+    for table_name, query in aggregates.items():
+        print(f"  • Materialising '{table_name}'...")
+        conn.execute(f"CREATE OR REPLACE TABLE {table_name} AS {query}")
@@ -1,3 +1,5 @@
+import pyarrow as pa
+
 from pathlib import Path
 
 
@@ -9,6 +11,7 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 TMP_DIR     = ROOT_DIR / 'tmp'
 DATA_DIR    = ROOT_DIR / 'data'
 CSV_DIR     = DATA_DIR / 'csv'
+ZIP_DIR     = DATA_DIR / 'zip'
 PARQUET_DIR = DATA_DIR / 'parquet'
 SQLITE_DIR  = DATA_DIR / 'sqlite'
 DUCKDB_DIR  = DATA_DIR / 'duckdb'
@@ -19,6 +22,8 @@ DICT_DIR = {
     'Estabelecimentos': CSV_DIR / 'estabelecimentos',
 }
 
+MANIFEST_PATH = DATA_DIR / 'manifest.json'
+
 SQLITE_PATH = SQLITE_DIR / 'rfb.sqlite3'
 DUCKDB_PATH = DUCKDB_DIR / 'rfb.duckdb'
 PARQUET_PARTNERS  = PARQUET_DIR / 'partners.parquet'
@@ -71,4 +76,178 @@ SORT_BUSINESS = [
     'cep'         ,
 ]
 
+SCHEMA_PARTNERS = pa.schema([
+    ('cnpj'        , pa.int32())                             ,
+    ('name_partner', pa.dictionary(pa.int32(), pa.string())),
+    ('start_date'  , pa.date32())                            ,
+])
+SCHEMA_COMPANIES = pa.schema([
+    ('cnpj'          , pa.int32()) ,
+    ('corporate_name', pa.string()),
+    ('capital'       , pa.int64()) ,
+])
+SCHEMA_BUSINESS = pa.schema([
+    ('cnpj'        , pa.int32()) ,
+    ('cnpj_order'  , pa.int16()) ,
+    ('cnpj_dv'     , pa.int8())  ,
+    ('branch'      , pa.bool_()) ,
+    ('trade_name'  , pa.string()),
+    ('closing_date', pa.date32()),
+    ('opening_date', pa.date32()),
+    ('cep'         , pa.int32()) ,
+])
+
+PAD_WIDTHS = {
+    'cnpj'      : 8,
+    'cnpj_order': 4,
+    'cnpj_dv'   : 2,
+    'cep'       : 8,
+}
+
+PARQUET_WRITER = {
+    'row_group_size': 250_000,
+    'page_index'    : True   ,
+}
+
+# bloom_filters lists the columns that must get a filter in every row group; DuckDB also adds them to the other dictionary-encoded columns
+PARQUET_BLOOM_WRITER = {
+    'row_group_size': 250_000  ,
+    'bloom_filters' : ('cnpj',),
+}
+
+SQLITE_PRAGMAS = {
+    'journal_mode'      : 'OFF'      ,
+    'synchronous'       : 'OFF'      ,
+    'cache_size'        : -1_048_576 ,
+    'temp_store'        : 'MEMORY'   ,
+    'locking_mode'      : 'EXCLUSIVE',
+    'defer_foreign_keys': 'ON'       ,
+}
+
+DUCKDB_TABLES = {
+    'companies': {
+        'cnpj'          : 'VARCHAR',
+        'corporate_name': 'VARCHAR',
+        'capital'       : 'BIGINT' ,
+    },
+    'partners': {
+        'cnpj'        : 'VARCHAR',
+        'name_partner': 'VARCHAR',
+        'start_date'  : 'DATE'   ,
+    },
+    'business': {
+        'cnpj'        : 'VARCHAR',
+        'cnpj_order'  : 'VARCHAR',
+        'cnpj_dv'     : 'VARCHAR',
+        'branch'      : 'BOOLEAN',
+        'trade_name'  : 'VARCHAR',
+        'closing_date': 'DATE'   ,
+        'opening_date': 'DATE'   ,
+        'cep'         : 'VARCHAR',
+    },
+}
+DUCKDB_ORDER = {
+    'companies': 'cnpj'              ,
+    'partners' : 'start_date, cnpj'  ,
+    'business' : 'opening_date, cnpj',
+}
+
+SQLITE_TABLES = {
+    'companies': '''
+        CREATE TABLE companies (
+            cnpj TEXT PRIMARY KEY,
+            corporate_name TEXT,
+            capital INTEGER
+        )
+    ''',
+    'partners': '''
+        CREATE TABLE partners (
+            cnpj TEXT,
+            name_partner TEXT,
+            start_date TEXT,
+            FOREIGN KEY (cnpj) REFERENCES companies(cnpj)
+        )
+    ''',
+    'business': '''
+        CREATE TABLE business (
+            cnpj TEXT,
+            cnpj_order TEXT,
+            cnpj_dv TEXT,
+            branch BOOLEAN,
+            trade_name TEXT,
+            closing_date TEXT,
+            opening_date TEXT,
+            cep TEXT,
+            PRIMARY KEY (cnpj, cnpj_order, cnpj_dv),
+            FOREIGN KEY (cnpj) REFERENCES companies(cnpj)
+        )
+    ''',
+}
+SQLITE_TABLES_COMPACT = {
+    'companies': '''
+        CREATE TABLE companies (
+            cnpj INTEGER PRIMARY KEY,
+            corporate_name TEXT,
+            capital INTEGER
+        )
+    ''',
+    'partners': '''
+        CREATE TABLE partners (
+            rowid INTEGER NOT NULL,
+            cnpj INTEGER NOT NULL,
+            name_partner TEXT,
+            start_date TEXT,
+            PRIMARY KEY (cnpj, rowid),
+            FOREIGN KEY (cnpj) REFERENCES companies(cnpj)
+        ) WITHOUT ROWID
+    ''',
+    'business': '''
+        CREATE TABLE business (
+            rowid INTEGER NOT NULL,
+            cnpj INTEGER NOT NULL,
+            cnpj_order INTEGER NOT NULL,
+            cnpj_dv INTEGER NOT NULL,
+            branch BOOLEAN,
+            trade_name TEXT,
+            closing_date TEXT,
+            opening_date TEXT,
+            cep INTEGER,
+            PRIMARY KEY (cnpj, cnpj_order, cnpj_dv),
+            FOREIGN KEY (cnpj) REFERENCES companies(cnpj)
+        ) WITHOUT ROWID
+    ''',
+}
+
+SQLITE_INDEXES = [
+    'CREATE INDEX idx_partners_cnpj ON partners(cnpj)',
+    'CREATE INDEX idx_business_cnpj ON business(cnpj)',
+    'CREATE INDEX idx_partners_start_date ON partners(start_date)',
+    'CREATE INDEX idx_business_opening_closing ON business(opening_date, closing_date)',
+]
+SQLITE_INDEXES_COMPACT = [
+    'CREATE UNIQUE INDEX idx_partners_rowid ON partners(rowid)',
+    'CREATE UNIQUE INDEX idx_business_rowid ON business(rowid)',
+    'CREATE INDEX idx_partners_start_date ON partners(start_date)',
+    'CREATE INDEX idx_business_opening_closing ON business(opening_date, closing_date)',
+]
+
+SQLITE_FTS = {
+    'companies_fts': ('companies', 'corporate_name'),
+    'partners_fts' : ('partners' , 'name_partner')  ,
+    'business_fts' : ('business' , 'trade_name')    ,
+}
+
+SQLITE_FTS_OPTIONS = {
+    'prefix'  : '1 2 3 4'                      ,
+    'tokenize': 'unicode61 remove_diacritics 2',
+}
+
+SQLITE_PAGE_SIZE     = 16_384
+SQLITE_KEEP_VERSIONS = 2
+
 CHUNKSIZE = 1_500_000
+
+MEMORY_BUDGET = 2 * 1024 ** 3
+
+EXTRACTORS       = 3
+MAX_PENDING_ZIPS = 4
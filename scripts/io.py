@@ -1,6 +1,21 @@
+import os
+import json
+import time
 import shutil
 import zipfile
 import requests
+import threading
+
+from contextlib         import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .manifest import load_manifest      , \
+                      update_manifest    , \
+                      file_sha256        , \
+                      snapshot_name      , \
+                      conditional_headers, \
+                      is_unchanged       , \
+                      is_newer_than_remote
 
 
 def ensure_dirs(paths):
@@ -8,43 +23,345 @@ def ensure_dirs(paths):
         path.mkdir(parents=True, exist_ok=True)
 
 
-def download_file(url, dest, chunk_size=524288):
+def resolve_parquet(path):
+    if path.exists():
+        return path
+
+    return path.with_suffix('')
+
+
+def download_stream(url, dest, chunk_size=524288):
+    tmp_path = dest.with_name(dest.name + '.part')
+
     with requests.get(url, stream=True) as r:
         r.raise_for_status()
 
-        with open(dest, "wb") as f:
+        with open(tmp_path, "wb") as f:
             for chunk in r.iter_content(chunk_size):
                 f.write(chunk)
 
+    os.replace(tmp_path, dest)
 
-def extract_and_rename(zip_path, filename, length=1024*1024):
+
+def probe_file(url, headers=None):
+    with requests.head(url, headers=headers, allow_redirects=True) as r:
+        if r.status_code == 304:
+            return None
+
+        r.raise_for_status()
+
+        return {
+            'size'         : int(r.headers.get('Content-Length', 0))              ,
+            'ranges'       : r.headers.get('Accept-Ranges', '').lower() == 'bytes',
+            'etag'         : r.headers.get('ETag')                                ,
+            'last_modified': r.headers.get('Last-Modified')                       ,
+        }
+
+
+def load_state(state_path, url, size):
+    if state_path.exists():
+        with open(state_path) as f:
+            state = json.load(f)
+
+        if state['url'] == url and state['size'] == size:
+            return state
+
+    return None
+
+
+def save_state(state_path, state):
+    tmp_path = state_path.with_name(state_path.name + '.tmp')
+
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+
+    os.replace(tmp_path, state_path)
+
+
+def new_state(url, size, segment_size):
+    return {
+        'url'     : url ,
+        'size'    : size,
+        'segments': [
+            [start, min(start + segment_size, size) - 1, 0]
+            for start in range(0, size, segment_size)
+        ],
+    }
+
+
+def checkpoint_segment(f, segment, progress, state, state_path, lock):
+    f.flush()
+    os.fsync(f.fileno())
+
+    with lock:
+        segment[2] = progress
+        save_state(state_path, state)
+
+
+def download_segment(
+    url            ,
+    dest           ,
+    segment        ,
+    state          ,
+    state_path     ,
+    lock           ,
+    chunk_size     ,
+    retries        ,
+    checkpoint_size,
+    backoff        ,
+):
+    start, end, _ = segment
+
+    for attempt in range(retries + 1):
+        offset = start + segment[2]
+        if offset > end:
+            return
+
+        try:
+            headers = {'Range': f'bytes={offset}-{end}'}
+
+            with requests.get(url, headers=headers, stream=True) as r:
+                r.raise_for_status()
+
+                if r.status_code != 206:
+                    raise RuntimeError(f"Server ignored range request for {url}")
+
+                with open(dest, 'r+b') as f:
+                    f.seek(offset)
+                    checkpoint = offset
+
+                    try:
+                        for chunk in r.iter_content(chunk_size):
+                            chunk = chunk[:end - offset + 1]
+                            f.write(chunk)
+                            offset += len(chunk)
+
+                            if offset - checkpoint >= checkpoint_size:
+                                checkpoint_segment(f, segment, offset - start, state, state_path, lock)
+                                checkpoint = offset
+                    finally:
+                        if offset > checkpoint:
+                            checkpoint_segment(f, segment, offset - start, state, state_path, lock)
+
+            if offset > end:
+                return
+
+            raise RuntimeError(f"Incomplete segment {start}-{end} from {url}")
+
+        except Exception:
+            if attempt == retries:
+                raise
+
+            time.sleep(backoff * 2 ** attempt)
+
+
+def download_file(
+    url                        ,
+    dest                       ,
+    chunk_size=524288          ,
+    workers=8                  ,
+    segment_size=64*1024*1024  ,
+    retries=3                  ,
+    checkpoint_size=8*1024*1024,
+    backoff=1                  ,
+):
+    info = probe_file(url)
+    size = info['size']
+
+    if not info['ranges'] or not size:
+        download_stream(url, dest, chunk_size)
+        return info
+
+    state_path = dest.with_name(dest.name + '.state')
+    state      = load_state(state_path, url, size)
+
+    if state is None or not dest.exists():
+        state = new_state(url, size, segment_size)
+
+        with open(dest, 'wb') as f:
+            f.truncate(size)
+
+        save_state(state_path, state)
+
+    lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                download_segment,
+                url            ,
+                dest           ,
+                segment        ,
+                state          ,
+                state_path     ,
+                lock           ,
+                chunk_size     ,
+                retries        ,
+                checkpoint_size,
+                backoff        ,
+            )
+            for segment in state['segments']
+            if segment[2] < segment[1] - segment[0] + 1
+        ]
+
+        for future in futures:
+            future.result()
+
+    os.remove(state_path)
+
+    return info
+
+
+def is_complete(path):
+    return path.exists() and not path.with_name(path.name + '.state').exists()
+
+
+def clean_tmp_dir(tmp_dir):
+    pending = [path.with_suffix('') for path in tmp_dir.glob('*.state')]
+
+    if not pending:
+        shutil.rmtree(tmp_dir)
+        return pending
+
+    for path in tmp_dir.iterdir():
+        if path.is_file() and path.suffix != '.state' and path not in pending:
+            os.remove(path)
+
+    return pending
+
+
+@contextmanager
+def open_zip_member(zip_path):
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
         [file] = zip_ref.namelist()
 
-        with zip_ref.open(file) as src, open(filename, 'wb') as dst:
-            shutil.copyfileobj(src, dst, length)
+        with zip_ref.open(file) as src:
+            yield src
+
+
+def open_source(path):
+    if path.suffix.lower() == '.zip':
+        return open_zip_member(path)
 
+    return open(path, 'rb')
+
+
+def extract_and_rename(zip_path, filename, length=1024*1024):
+    with open_zip_member(zip_path) as src, open(filename, 'wb') as dst:
+        shutil.copyfileobj(src, dst, length)
+
+
+def downloader_worker(
+    url               ,
+    file_type         ,
+    total             ,
+    target_dir        ,
+    tmp_dir           ,
+    task_queue=None   ,
+    stats_queue=None  ,
+    manifest_path=None,
+    manifest_lock=None,
+):
+    manifest = load_manifest(manifest_path) if manifest_path else {}
+    snapshot = snapshot_name(url)
 
-def downloader_worker(url, file_type, total, target_dir, tmp_dir, task_queue):
     for i in range(total):
-        filename = target_dir / f"{file_type.lower()}{i}.csv"
+        key = f"{file_type}{i}.zip"
 
-        if filename.exists():
-            print(f"[Download] Already exists: {filename.name}, skipping download.")
+        if task_queue is None:
+            filename = target_dir / key
         else:
-            url_path = f"{url}{file_type}{i}.zip"
-            zip_path = tmp_dir / f"{file_type}{i}.zip"
+            filename = target_dir / f"{file_type.lower()}{i}.csv"
+
+        url_path = f"{url}{key}"
+        entry    = manifest.get('files', {}).get(key)
+
+        try:
+            if manifest_path is None:
+                if is_complete(filename):
+                    print(f"[Download] Already exists: {filename.name}, skipping download.")
+                    continue
+
+            elif entry and is_complete(filename):
+                info = probe_file(url_path, conditional_headers(entry))
+
+                if info is None or is_unchanged(entry, info):
+                    print(f"[Download] Unchanged since {entry['snapshot']}: {key}, skipping download.")
+                    update_manifest(
+                        manifest_path                                   ,
+                        key                                             ,
+                        {**entry, 'url': url_path, 'snapshot': snapshot},
+                        manifest_lock                                   ,
+                    )
+                    continue
+
+            elif entry is None and is_complete(filename):
+                info = probe_file(url_path)
+
+                if is_newer_than_remote(filename, info):
+                    print(f"[Download] Already exists and newer than the remote archive: {filename.name}, skipping download.")
+                    update_manifest(
+                        manifest_path,
+                        key          ,
+                        {
+                            'url'          : url_path                                             ,
+                            'snapshot'     : snapshot                                             ,
+                            'size'         : info['size']                                         ,
+                            'etag'         : info['etag']                                         ,
+                            'last_modified': info['last_modified']                                ,
+                            'sha256'       : file_sha256(filename) if task_queue is None else None,
+                        },
+                        manifest_lock,
+                    )
+                    continue
+
+            zip_path = tmp_dir / key             \
+                       if task_queue is not None \
+                       else filename
 
             print(f"[Download] Downloading {url_path}...")
 
-            try:
-                download_file(url_path, zip_path)
-                task_queue.put((zip_path, filename))
-            except Exception as e:
-                print(f"[Download Error] {url_path}: {e}")
+            start = time.time()
+            info  = download_file(url_path, zip_path)
+
+            if stats_queue is not None:
+                stats_queue.put(('download', zip_path.stat().st_size, start, time.time()))
+
+            record = None
+            if manifest_path is not None:
+                record = key, {
+                    'url'          : url_path             ,
+                    'snapshot'     : snapshot             ,
+                    'size'         : info['size']         ,
+                    'etag'         : info['etag']         ,
+                    'last_modified': info['last_modified'],
+                    'sha256'       : file_sha256(zip_path),
+                }
+
+                if entry and entry['sha256'] == record[1]['sha256'] and is_complete(filename):
+                    print(f"[Download] Same content as {entry['snapshot']}: {key}, skipping extraction.")
+
+                    if task_queue is not None:
+                        os.remove(zip_path)
+
+                    update_manifest(manifest_path, *record, manifest_lock)
+                    continue
 
+            if task_queue is not None:
+                task_queue.put((zip_path, filename, record))
+            elif record is not None:
+                update_manifest(manifest_path, *record, manifest_lock)
 
-def extractor_worker(task_queue):
+        except Exception as e:
+            print(f"[Download Error] {url_path}: {e}")
+
+
+def extractor_worker(
+    task_queue        ,
+    stats_queue=None  ,
+    manifest_path=None,
+    manifest_lock=None,
+):
     while True:
         try:
             item = task_queue.get()
@@ -52,11 +369,20 @@ def extractor_worker(task_queue):
                 task_queue.task_done()
                 break
 
-            zip_path, filename = item
+            zip_path, filename, record = item
 
             print(f"[Extraction] Extracting {zip_path.name}...")
             try:
+                start = time.time()
                 extract_and_rename(zip_path, filename)
+
+                if stats_queue is not None:
+                    stats_queue.put(('extract', filename.stat().st_size, start, time.time()))
+
+                if record is not None:
+                    update_manifest(manifest_path, *record, manifest_lock)
+
+                os.remove(zip_path)
             except Exception as e:
                 print(f"[Extraction Error] {zip_path}: {e}")
             finally:
@@ -64,3 +390,24 @@ def extractor_worker(task_queue):
 
         except Exception as e:
             print(f"[General Extraction Error]: {e}")
+
+
+def report_throughput(records):
+    print()
+    print("📊 Ingestion throughput summary:")
+
+    for stage in ('download', 'extract'):
+        entries = [r for r in records if r[0] == stage]
+        if not entries:
+            continue
+
+        nbytes = sum(r[1] for r in entries)
+        busy   = sum(r[3] - r[2] for r in entries)
+        wall   = max(r[3] for r in entries) - min(r[2] for r in entries)
+
+        mb = nbytes / 1024 / 1024
+        print(
+            f"  • {stage:<8}: {len(entries):>2} files, {mb:,.1f} MB in {wall:.1f}s "
+            f"→ {mb / wall if wall else 0:,.1f} MB/s aggregate, "
+            f"{mb / busy if busy else 0:,.1f} MB/s per worker"
+        )
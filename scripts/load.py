@@ -1,32 +1,313 @@
+import os
 import time
-import pyarrow.parquet as pq
+import sqlite3
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .io        import resolve_parquet
+from .process   import read_row_groups
+from .constants import PAD_WIDTHS            , \
+                       DUCKDB_TABLES         , \
+                       DUCKDB_ORDER          , \
+                       SQLITE_FTS            , \
+                       SQLITE_TABLES         , \
+                       SQLITE_TABLES_COMPACT , \
+                       SQLITE_INDEXES        , \
+                       SQLITE_INDEXES_COMPACT, \
+                       SQLITE_FTS_OPTIONS    , \
+                       SQLITE_PRAGMAS        , \
+                       SQLITE_KEEP_VERSIONS
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+FTS_SHADOW_TABLES = ('data', 'idx', 'docsize', 'config')
+
+
+def configure_bulk_load(conn, pragmas=SQLITE_PRAGMAS):
+    for pragma, value in pragmas.items():
+        conn.execute(f'PRAGMA {pragma} = {value}')
+
+
+def create_tables(conn, compact=False):
+    tables = SQLITE_TABLES_COMPACT if compact else SQLITE_TABLES
+
+    for statement in tables.values():
+        conn.execute(statement)
+
+    conn.commit()
+
+
+def create_indexes(conn, compact=False):
+    for statement in SQLITE_INDEXES_COMPACT if compact else SQLITE_INDEXES:
+        conn.execute(statement)
+
+    conn.commit()
+
+
+def sqlite_type(name, arrow_type):
+    if name in PAD_WIDTHS:
+        return 'TEXT'
+
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return 'INTEGER'
+    if pa.types.is_floating(arrow_type):
+        return 'REAL'
+
+    return 'TEXT'
+
+
+def ensure_table(conn, table_name, schema):
+    columns = ', '.join(
+        f'{field.name} {sqlite_type(field.name, field.type)}'
+        for field in schema
+    )
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {table_name} ({columns})')
+
+
+def sqlite_values(column, name, pad_keys=True):
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+
+    if pa.types.is_date(column.type) or pa.types.is_timestamp(column.type):
+        column = pc.strftime(column, format='%Y-%m-%d')
+    elif pa.types.is_integer(column.type) and name in PAD_WIDTHS and pad_keys:
+        column = pc.utf8_lpad(pc.cast(column, pa.string()), PAD_WIDTHS[name], '0')
+
+    if column.null_count and not pa.types.is_string(column.type):
+        return column.to_pylist()
+
+    return column.to_numpy(zero_copy_only=False).tolist()
 
 
 def insert_parquet(
-    conn        ,
-    table_name  ,
-    parquet_file,
+    conn              ,
+    table_name        ,
+    parquet_file      ,
+    batch_size=100_000,
+    pad_keys=True     ,
+    rowid=False       ,
 ):
     print()
     print(f"📥 Loading and inserting data into '{table_name}' from Parquet (by row group)...")
 
-    table = pq.ParquetFile(parquet_file)
-    for i in range(table.num_row_groups):
+    next_rowid = 1
+
+    for i, table in enumerate(read_row_groups(resolve_parquet(parquet_file))):
         print(f"  • Processing row_group {i + 1}...")
 
-        df = table.read_row_group(i).to_pandas()
+        if i == 0:
+            ensure_table(conn, table_name, table.schema)
+
+        names = ['rowid'] * rowid + table.column_names
+        query = f"INSERT INTO {table_name} ({', '.join(names)}) " \
+                f"VALUES ({', '.join('?' * len(names))})"
+
+        for batch in table.to_batches(max_chunksize=batch_size):
+            columns = [
+                sqlite_values(column, name, pad_keys)
+                for column, name in zip(batch.columns, batch.schema.names)
+            ]
+
+            if rowid:
+                columns.insert(0, range(next_rowid, next_rowid + batch.num_rows))
+                next_rowid += batch.num_rows
+
+            conn.executemany(query, zip(*columns))
+
+
+def fts_options(options):
+    return ''.join(
+        f", {option}='{value}'"
+        for option, value in options.items()
+        if value
+    )
+
+
+def create_fts(conn, fts_table, table, column, options=SQLITE_FTS_OPTIONS):
+    conn.execute(
+        f'CREATE VIRTUAL TABLE {fts_table} '
+        f'USING fts5({column}, content="{table}", content_rowid="rowid"{fts_options(options)})'
+    )
+
+
+def fts_shard_path(db_path, fts_table):
+    return db_path.with_name(f'{db_path.name}.{fts_table}')
+
+
+def build_fts_shard(db_path, fts_table, table, column, options=SQLITE_FTS_OPTIONS):
+    start      = time.perf_counter()
+    shard_path = fts_shard_path(db_path, fts_table)
+    shard_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(shard_path)
+    configure_bulk_load(conn)
+    conn.execute('ATTACH DATABASE ? AS src', (db_path.as_posix(),))
+
+    create_fts(conn, fts_table, table, column, options)
+    conn.execute(f'INSERT INTO {fts_table}(rowid, {column}) SELECT rowid, {column} FROM src.{table}')
+    conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES('optimize')")
+    conn.commit()
+    conn.close()
+
+    return time.perf_counter() - start
+
+
+def merge_fts_shard(conn, db_path, fts_table, table, column, options=SQLITE_FTS_OPTIONS):
+    shard_path = fts_shard_path(db_path, fts_table)
+
+    create_fts(conn, fts_table, table, column, options)
+    conn.execute('ATTACH DATABASE ? AS shard', (shard_path.as_posix(),))
+
+    for suffix in FTS_SHADOW_TABLES:
+        conn.execute(f'DELETE FROM main.{fts_table}_{suffix}')
+        conn.execute(f'INSERT INTO main.{fts_table}_{suffix} SELECT * FROM shard.{fts_table}_{suffix}')
+
+    conn.commit()
+    conn.execute('DETACH DATABASE shard')
+
+    shard_path.unlink()
 
-        for col in df.select_dtypes(include=["datetime64[ns]"]):
-            df[col] = df[col].dt.strftime("%Y-%m-%d")
 
-        df.to_sql(
-            table_name        ,
-            conn              ,
-            index=False       ,
-            if_exists='append',
-        )
+def build_fts(
+    db_path                   ,
+    fts_tables=SQLITE_FTS     ,
+    options=SQLITE_FTS_OPTIONS,
+    workers=None              ,
+):
+    print()
+    print(f"🧵 Building {len(fts_tables)} FTS5 indexes in parallel...")
+
+    with ProcessPoolExecutor(max_workers=workers or len(fts_tables)) as executor:
+        futures = {
+            fts_table: executor.submit(build_fts_shard, db_path, fts_table, table, column, options)
+            for fts_table, (table, column) in fts_tables.items()
+        }
+
+        for fts_table, future in futures.items():
+            print(f"  • {fts_table}: built in {future.result():.2f} seconds")
+
+    conn = sqlite3.connect(db_path)
+    configure_bulk_load(conn)
+
+    for fts_table, (table, column) in fts_tables.items():
+        merge_fts_shard(conn, db_path, fts_table, table, column, options)
+
+    return conn
+
+
+def versioned_path(path, timestamp=None):
+    return path.with_name(f"{path.stem}-{time.strftime('%Y%m%dT%H%M%S', timestamp)}{path.suffix}")
+
+
+def build_path(version_path):
+    return version_path.with_name(version_path.name + '.tmp')
+
+
+def list_versions(path):
+    return sorted(path.parent.glob(f'{path.stem}-[0-9]*{path.suffix}'))
+
+
+def verify_database(conn, tables):
+    result = conn.execute('PRAGMA quick_check').fetchall()
+    if result != [('ok',)]:
+        raise RuntimeError(f"Integrity check failed: {result[:5]}")
+
+    counts = {
+        table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        for table in tables
+    }
+
+    empty = [table for table, count in counts.items() if not count]
+    if empty:
+        raise RuntimeError(f"Empty tables after load: {', '.join(empty)}")
+
+    return counts
+
+
+def optimize_database(conn, fts_tables=()):
+    for table in fts_tables:
+        conn.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA optimize')
+    conn.commit()
+
+
+def adopt_legacy_database(path, sidecars=('-wal', '-shm', '-journal', '.wal')):
+    if path.is_symlink() or not path.exists():
+        return None
+
+    legacy_path = versioned_path(path, time.localtime(path.stat().st_mtime))
+    print(f"📦 Keeping the existing {path.name} as {legacy_path.name}")
+
+    for sidecar in sidecars:
+        sidecar_path = path.with_name(path.name + sidecar)
+        if sidecar_path.exists():
+            os.replace(sidecar_path, legacy_path.with_name(legacy_path.name + sidecar))
+
+    os.replace(path, legacy_path)
+
+    return legacy_path
+
+
+def swap_database(version_path, path):
+    adopt_legacy_database(path)
+
+    tmp_link = path.with_name(path.name + '.link')
+    tmp_link.unlink(missing_ok=True)
+    tmp_link.symlink_to(version_path.name)
+
+    os.replace(tmp_link, path)
+
+
+def prune_versions(path, keep=SQLITE_KEEP_VERSIONS):
+    current  = path.resolve()
+    versions = [version for version in list_versions(path) if version != current]
+
+    for version in versions[:max(len(versions) - keep + 1, 0)]:
+        version.unlink()
+
+    for stale in path.parent.glob(f'{path.stem}-[0-9]*{path.suffix}.tmp*'):
+        stale.unlink()
+
+
+def duckdb_source(parquet_file):
+    path = resolve_parquet(parquet_file)
+
+    if path.is_dir():
+        return f"read_parquet('{path.as_posix()}/**/*.parquet')"
+
+    return f"read_parquet('{path.as_posix()}')"
+
+
+def duckdb_column(name, duckdb_type):
+    if name in PAD_WIDTHS:
+        return f"lpad(CAST({name} AS VARCHAR), {PAD_WIDTHS[name]}, '0') AS {name}"
+
+    return f"CAST({name} AS {duckdb_type}) AS {name}"
+
+
+def load_duckdb_table(conn, table_name, parquet_file):
+    columns = DUCKDB_TABLES[table_name]
+
+    print()
+    print(f"📥 Loading '{table_name}' from Parquet ordered by {DUCKDB_ORDER[table_name]}...")
 
-        del df
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    conn.execute(
+        f"CREATE TABLE {table_name} ("
+        f"{', '.join(f'{name} {duckdb_type}' for name, duckdb_type in columns.items())})"
+    )
+    conn.execute(
+        f"INSERT INTO {table_name} "
+        f"SELECT {', '.join(duckdb_column(name, duckdb_type) for name, duckdb_type in columns.items())} "
+        f"FROM {duckdb_source(parquet_file)} "
+        f"ORDER BY {DUCKDB_ORDER[table_name]}"
+    )
 
 
 def measure_query_time(cursor, query, label):
@@ -0,0 +1,74 @@
+import os
+import json
+import hashlib
+
+from email.utils import parsedate_to_datetime
+
+
+def load_manifest(path):
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+
+    return {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = path.with_name(path.name + '.tmp')
+
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+
+def update_manifest(path, key, entry, lock):
+    with lock:
+        manifest = load_manifest(path)
+
+        manifest.setdefault('files', {})[key] = entry
+        manifest.setdefault('snapshots', {}) \
+                .setdefault(entry['snapshot'], {})[key] = entry['sha256']
+
+        save_manifest(path, manifest)
+
+
+def file_sha256(path, length=1024*1024):
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        while block := f.read(length):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def snapshot_name(url):
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+def conditional_headers(entry):
+    headers = {}
+
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    return headers
+
+
+def is_unchanged(entry, info):
+    if entry.get('etag') and info['etag']:
+        return entry['etag'] == info['etag']
+
+    return entry.get('last_modified') is not None              and \
+           entry.get('last_modified') == info['last_modified'] and \
+           entry.get('size')          == info['size']
+
+
+def is_newer_than_remote(path, info):
+    if not info['last_modified']:
+        return False
+
+    return path.stat().st_mtime >= parsedate_to_datetime(info['last_modified']).timestamp()
@@ -1,43 +1,1084 @@
+import os
+import csv
+import base64
+import time
+import queue
+import heapq
+import shutil
+import resource
+import bisect
+import duckdb
+import itertools
+import threading
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+from contextlib         import contextmanager
+from collections        import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from .io       import open_source    , \
+                      resolve_parquet
+from .manifest import load_manifest, \
+                      save_manifest
+
+
+TIMINGS  = defaultdict(float)
+PEAK_RSS = defaultdict(int)
+
+_depth = 0
+
+
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def timed(stage):
+    """Add the elapsed time and peak RSS of the block to TIMINGS / PEAK_RSS under `stage`.
+
+    The outermost block resets the kernel's peak RSS (VmHWM) for the whole process, so
+    nested blocks report the peak since the outer block started, and timings running
+    concurrently in other threads of the same process are reset as well.
+    """
+    global _depth
+
+    if not _depth:
+        reset_peak_rss()
+
+    _depth += 1
+    start   = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        _depth -= 1
+
+        TIMINGS [stage] += time.perf_counter() - start
+        PEAK_RSS[stage]  = max(PEAK_RSS[stage], peak_rss())
+
+
+def clear_timings():
+    TIMINGS .clear()
+    PEAK_RSS.clear()
+
+
+def merge_timings(timings, peaks):
+    for stage, seconds in timings.items():
+        TIMINGS[stage] += seconds
+
+    for stage, nbytes in peaks.items():
+        PEAK_RSS[stage] = max(PEAK_RSS[stage], nbytes)
+
+
+def report_timings(label):
+    print()
+    print(f"⏱️ Stage timings for {label}:")
+
+    for stage, seconds in TIMINGS.items():
+        print(f"  • {stage:<12}: {seconds:8.2f}s, peak RSS {PEAK_RSS[stage] / 1024 ** 2:8,.0f} MB")
+
+    clear_timings()
+
+
+class ChunkSizer:
+    def __init__(self, memory_budget, initial_rows=100_000, overhead=4, min_rows=1_000):
+        self.memory_budget = memory_budget
+        self.overhead      = overhead
+        self.min_rows      = min_rows
+        self.rows          = initial_rows
+        self.row_bytes     = 0
+
+    def __int__(self):
+        return self.rows
+
+    def __repr__(self):
+        return f'auto:{self.memory_budget}'
+
+    def observe(self, chunk):
+        if chunk.empty:
+            return
+
+        self.row_bytes = max(self.row_bytes, chunk.memory_usage(deep=True).sum() / len(chunk))
+        self.rows      = max(int(self.memory_budget // (self.row_bytes * self.overhead)), self.min_rows)
+
+
+def read_csv_chunks(source, usecols, names, chunksize):
+    options = {
+        'sep'         : ';'       ,
+        'usecols'     : usecols   ,
+        'names'       : names     ,
+        'low_memory'  : False     ,
+        'encoding'    : 'latin-1' ,
+        'on_bad_lines': 'skip'    ,
+    }
+
+    if isinstance(chunksize, int):
+        yield from pd.read_csv(source, chunksize=chunksize, **options)
+        return
+
+    with pd.read_csv(source, iterator=True, **options) as reader:
+        while True:
+            try:
+                chunk = reader.get_chunk(int(chunksize))
+            except StopIteration:
+                return
+
+            chunksize.observe(chunk)
+            yield chunk
+
+
+def read_chunks(file_paths, usecols, names, chunksize, engine='pandas'):
+    if engine == 'arrow':
+        yield from read_chunks_arrow(file_paths, usecols, names, chunksize)
+        return
+
+    for file_path in file_paths:
+        print(f"[Transform] Reading {file_path.name}")
+
+        with open_source(file_path) as source:
+            yield from read_csv_chunks(source, usecols, names, chunksize)
+
+
+def positional_rows(rows, usecols):
+    def handler(row):
+        fields = next(csv.reader([row.text], delimiter=';'), [])
+        heapq.heappush(rows, (row.number, [
+            fields[i] or None if i < len(fields) else None
+            for i in sorted(usecols)
+        ]))
+
+        return 'skip'
+
+    return handler
+
+
+def restore_rows(table, rows, start, last=False):
+    pieces = []
+    cursor = 0
+    taken  = 0
+
+    # row.number is the 1-based position among the non-empty rows, valid or not
+    while rows and (last or rows[0][0] - 1 < start + table.num_rows + taken):
+        number, values = heapq.heappop(rows)
+        valid          = min(number - 1 - start - taken, table.num_rows)
+
+        pieces.append(table.slice(cursor, valid - cursor))
+        pieces.append(pa.Table.from_arrays(
+            [pa.array([value], pa.string()) for value in values],
+            schema=table.schema                                 ,
+        ))
+
+        cursor = valid
+        taken += 1
+
+    pieces.append(table.slice(cursor))
+
+    return pa.concat_tables(pieces), taken
+
+
+def read_chunks_arrow(file_paths, usecols, names, chunksize, block_size=64*1024*1024):
+    columns = [f'f{i}' for i in sorted(usecols)]
+
+    for file_path in file_paths:
+        print(f"[Transform] Reading {file_path.name} (arrow)")
+
+        invalid   = []
+        position  = 0
+        recovered = 0
+
+        with open_source(file_path) as source:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(
+                    encoding='latin-1'            ,
+                    block_size=block_size         ,
+                    autogenerate_column_names=True,
+                ),
+                parse_options=pa_csv.ParseOptions(
+                    delimiter=';'                                         ,
+                    invalid_row_handler=positional_rows(invalid, usecols),
+                ),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=columns                          ,
+                    column_types={col: pa.string() for col in columns},
+                    strings_can_be_null=True                         ,
+                ),
+            )
+
+            pending = reader.schema.empty_table()
+
+            for batch in reader:
+                table, taken = restore_rows(pa.Table.from_batches([batch]), invalid, position)
+                position    += table.num_rows
+                recovered   += taken
+                pending      = pa.concat_tables([pending, table])
+
+                while pending.num_rows >= int(chunksize):
+                    rows    = int(chunksize)
+                    chunk   = pending.slice(0, rows).rename_columns(names).to_pandas()
+                    pending = pending.slice(rows)
+
+                    if not isinstance(chunksize, int):
+                        chunksize.observe(chunk)
+
+                    yield chunk
+
+            table, taken = restore_rows(reader.schema.empty_table(), invalid, position, last=True)
+            recovered   += taken
+            pending      = pa.concat_tables([pending, table])
+
+            if pending.num_rows:
+                yield pending.rename_columns(names).to_pandas()
+
+        if recovered:
+            print(f"[Transform] Padded {recovered} rows of {file_path.name} with a mismatched field count")
+
+
+def read_row_groups(parquet_path):
+    if parquet_path.is_dir():
+        dataset = ds.dataset(parquet_path, format='parquet', partitioning='hive')
+        columns = pq.read_schema(parquet_path / '_common_metadata').names
+
+        for fragment in dataset.get_fragments():
+            yield fragment.to_table(columns=columns)
+        return
+
+    table = pq.ParquetFile(parquet_path)
+    for i in range(table.num_row_groups):
+        yield table.read_row_group(i)
+
+
+def bloom_copy_options(schema, options, fpp=0.01):
+    arrow_schema = base64.b64encode(schema.serialize().to_pybytes()).decode()
+
+    # DuckDB only builds bloom filters from column dictionaries and rounds row groups up,
+    # so the dictionary limit must exceed the row-group size for the unique keys to get one;
+    # the ARROW:schema entry lets pyarrow restore the dictionary-typed --compact columns
+    return f"""
+        FORMAT parquet,
+        ROW_GROUP_SIZE {options['row_group_size']},
+        DICTIONARY_SIZE_LIMIT {2 * options['row_group_size']},
+        BLOOM_FILTER_FALSE_POSITIVE_RATIO {fpp},
+        KV_METADATA {{'ARROW:schema': '{arrow_schema}'}}
+    """
+
+
+def check_bloom_columns(schema, options):
+    missing = set(options['bloom_filters']) - set(schema.names)
+    if missing:
+        raise ValueError(f"Bloom filter columns not in the schema: {sorted(missing)}")
+
+
+def verify_bloom_filters(path, columns):
+    with duckdb.connect() as conn:
+        missing = conn.execute(f"""
+            SELECT DISTINCT file_name, path_in_schema
+            FROM parquet_metadata('{path}')
+            WHERE path_in_schema IN ({', '.join('?' for _ in columns)})
+              AND bloom_filter_offset IS NULL
+        """, list(columns)).fetchall()
+
+    if missing:
+        raise RuntimeError(f"Row groups written without a bloom filter: {sorted(missing)}")
+
+
+class FileWriter:
+    def __init__(self, parquet_path, schema=None, options=None):
+        self.parquet_path = parquet_path
+        self.schema       = schema
+        self.options      = options or {}
+        self.writer       = None
+
+    def write_table(self, table):
+        if self.writer is None:
+            self.schema = self.schema or table.schema
+            self.writer = pq.ParquetWriter(
+                self.parquet_path                                     ,
+                self.schema                                           ,
+                write_page_index=self.options.get('page_index', False),
+            )
+
+        self.writer.write_table(table, row_group_size=self.options.get('row_group_size'))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class BloomFileWriter:
+    def __init__(self, parquet_path, schema=None, options=None):
+        self.parquet_path = parquet_path
+        self.schema       = schema
+        self.options      = options
+        self.batches      = queue.Queue(maxsize=2)
+        self.thread       = None
+        self.error        = None
+
+    def copy(self, reader):
+        try:
+            with duckdb.connect() as conn:
+                conn.register('batches', reader)
+                conn.execute(f"""
+                    COPY (SELECT * FROM batches)
+                    TO '{self.parquet_path}' ({bloom_copy_options(self.schema, self.options)})
+                """)
+        except Exception as error:
+            self.error = error
+
+    def put(self, batch):
+        while True:
+            try:
+                self.batches.put(batch, timeout=1)
+                return
+            except queue.Full:
+                if not self.thread.is_alive():
+                    raise RuntimeError(f"Bloom filter writer for {self.parquet_path} stopped") from self.error
+
+    def write_table(self, table):
+        if self.thread is None:
+            self.schema = self.schema or table.schema
+            check_bloom_columns(self.schema, self.options)
+
+            reader      = pa.RecordBatchReader.from_batches(self.schema, iter(self.batches.get, None))
+            self.thread = threading.Thread(target=self.copy, args=(reader,), daemon=True)
+            self.thread.start()
+
+        for batch in table.to_batches():
+            self.put(batch)
+
+    def close(self):
+        if self.thread is None:
+            return
+
+        self.put(None)
+        self.thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+        verify_bloom_filters(self.parquet_path, self.options['bloom_filters'])
+
+
+class DatasetWriter:
+    def __init__(self, root, partitions, schema=None, options=None):
+        self.root       = root
+        self.partitions = partitions
+        self.schema     = schema
+        self.options    = options or {}
+        self.count      = 0
+
+        if root.exists():
+            shutil.rmtree(root)
+
+    def write_table(self, table):
+        if self.schema is None:
+            self.schema = table.schema
+
+        for name, partition in self.partitions.items():
+            table = table.append_column(name, partition(table))
+
+        pq.write_to_dataset(
+            table                                                  ,
+            self.root                                              ,
+            partition_cols=list(self.partitions)                   ,
+            basename_template=f'part-{self.count:05}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore'           ,
+            max_rows_per_group=self.options.get('row_group_size')  ,
+            write_page_index=self.options.get('page_index', False) ,
+        )
+        self.count += 1
+
+    def close(self):
+        write_dataset_metadata(self.root)
+
+
+class BloomDatasetWriter(DatasetWriter):
+    def write_table(self, table):
+        if self.schema is None:
+            self.schema = table.schema
+            check_bloom_columns(self.schema, self.options)
+
+        for name, partition in self.partitions.items():
+            table = table.append_column(name, partition(table))
+
+        with duckdb.connect() as conn:
+            conn.register('batch', table)
+            conn.execute(f"""
+                COPY (SELECT * FROM batch)
+                TO '{self.root}' (
+                    {bloom_copy_options(self.schema, self.options)},
+                    PARTITION_BY ({', '.join(self.partitions)}),
+                    FILENAME_PATTERN 'part-{self.count:05}-{{i}}',
+                    OVERWRITE_OR_IGNORE
+                )
+            """)
+        self.count += 1
+
+    def close(self):
+        if self.count:
+            verify_bloom_filters(self.root / '**' / '*.parquet', self.options['bloom_filters'])
+
+        super().close()
+
+
+def write_dataset_metadata(root):
+    paths = sorted(root.rglob('*.parquet'))
+    if not paths:
+        return
+
+    metadata = None
+    for path in paths:
+        file_metadata = pq.read_metadata(path)
+        file_metadata.set_file_path(path.relative_to(root).as_posix())
+
+        if metadata is None:
+            metadata = file_metadata
+        else:
+            metadata.append_row_groups(file_metadata)
+
+    pq.write_metadata(pq.read_schema(paths[0]), root / '_common_metadata')
+    metadata.write_metadata_file(root / '_metadata')
+
+
+def open_writer(parquet_path, schema=None, partitions=None, options=None):
+    options = options or {}
+
+    if options.get('bloom_filters') and options.get('page_index'):
+        raise ValueError("pyarrow writes the page index and DuckDB the bloom filters, enable only one of them")
+
+    if partitions:
+        writer = BloomDatasetWriter if options.get('bloom_filters') else DatasetWriter
+        return writer(parquet_path, partitions, schema, options)
+
+    if schema is None and not options:
+        return None
+
+    writer = BloomFileWriter if options.get('bloom_filters') else FileWriter
+    return writer(parquet_path, schema, options)
+
+
+def write_empty(parquet_path, schema, names, partitions=None, writer_options=None):
+    schema = schema or pa.schema([(name, pa.string()) for name in names])
+    table  = schema.empty_table()
+
+    if partitions:
+        parquet_path.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, parquet_path / 'part-00000-0.parquet')
+        write_dataset_metadata(parquet_path)
+        return
+
+    pq.write_table(
+        table                                                           ,
+        parquet_path                                                    ,
+        write_page_index=(writer_options or {}).get('page_index', False),
+    )
+
+
+def write_chunk(chunk, parquet_path, first_write, writer=None):
+    if writer is not None:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+
+        if writer.schema is not None:
+            table = table.cast(writer.schema)
+
+        writer.write_table(table)
+        return
+
+    chunk.to_parquet(
+        parquet_path          ,
+        engine='fastparquet'  ,
+        index=False           ,
+        append=not first_write,
+    )
+
+
+def sort_chunk(chunk, sort_by):
+    return chunk.sort_values(
+        sort_by            ,
+        kind='stable'      ,
+        na_position='last' ,
+        ignore_index=True  ,
+    )
+
+
+def row_key(df, i, sort_by):
+    key = []
+
+    for col in sort_by:
+        value = df[col].iat[i]
+        key.append((1, 0) if pd.isna(value) else (0, value))
+
+    return tuple(key)
+
+
+def merge_runs(
+    run_paths     ,
+    parquet_path  ,
+    sort_by       ,
+    batch_rows    ,
+    row_group_rows,
+    writer=None   ,
+):
+    print(f"[Transform] Merging {len(run_paths)} sorted runs into {parquet_path.name}")
+
+    readers = [
+        pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+        for path in run_paths
+    ]
+    buffers = [None] * len(readers)
+
+    pending     = []
+    pending_len = 0
+    first_write = True
+
+    while True:
+        for i, reader in enumerate(readers):
+            while reader is not None and (buffers[i] is None or buffers[i].empty):
+                batch = next(reader, None)
+
+                if batch is None:
+                    readers[i] = reader = None
+                    buffers[i] = None
+                else:
+                    buffers[i] = batch.to_pandas()
+
+        active = [
+            buffer
+            for buffer in buffers
+            if buffer is not None and not buffer.empty
+        ]
+        if not active:
+            break
+
+        bound = min(
+            row_key(buffer, len(buffer) - 1, sort_by)
+            for buffer in active
+        )
+
+        for i, buffer in enumerate(buffers):
+            if buffer is None or buffer.empty:
+                continue
+
+            n = bisect.bisect_right(
+                range(len(buffer))                       ,
+                bound                                    ,
+                key=lambda j: row_key(buffer, j, sort_by),
+            )
+
+            if n:
+                pending.append(buffer.iloc[:n])
+                pending_len += n
+                buffers[i] = buffer.iloc[n:]
+
+        if pending_len >= row_group_rows:
+            write_chunk(sort_chunk(pd.concat(pending), sort_by), parquet_path, first_write, writer)
+
+            pending     = []
+            pending_len = 0
+            first_write = False
+
+    if pending:
+        write_chunk(sort_chunk(pd.concat(pending), sort_by), parquet_path, first_write, writer)
 
 
 def csv2parquet(
+    parquet_path               ,
+    file_paths                 ,
+    usecols                    ,
+    names                      ,
+    chunksize                  ,
+    transform=None             ,
+    sort_by=None               ,
+    sort_mode='chunk'          ,
+    memory_budget=2 * 1024 ** 3,
+    spill_dir=None             ,
+    engine='pandas'            ,
+    schema=None                ,
+    partitions=None            ,
+    writer_options=None        ,
+    checkpoint=False           ,
+):
+    if checkpoint:
+        return csv2parquet_checkpointed(
+            parquet_path                 ,
+            file_paths                   ,
+            usecols                      ,
+            names                        ,
+            chunksize                    ,
+            transform=transform          ,
+            sort_by=sort_by              ,
+            sort_mode=sort_mode          ,
+            memory_budget=memory_budget  ,
+            engine=engine                ,
+            schema=schema                ,
+            partitions=partitions        ,
+            writer_options=writer_options,
+        )
+
+    external = sort_by and sort_mode == 'external'
+
+    if external:
+        spill_dir = spill_dir or parquet_path.with_name(f'{parquet_path.stem}.spill')
+        spill_dir.mkdir(parents=True, exist_ok=True)
+
+    chunks = read_chunks(file_paths, usecols, names, chunksize, engine)
+    writer = open_writer(parquet_path, schema, partitions, writer_options)
+
+    try:
+        convert_chunks(
+            chunks       ,
+            parquet_path ,
+            chunksize    ,
+            transform    ,
+            sort_by      ,
+            external     ,
+            memory_budget,
+            spill_dir    ,
+            writer       ,
+        )
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if not parquet_path.exists():
+        write_empty(parquet_path, schema, names, partitions, writer_options)
+
+    return dict(TIMINGS)
+
+
+def convert_chunks(
+    chunks       ,
+    parquet_path ,
+    chunksize    ,
+    transform    ,
+    sort_by      ,
+    external     ,
+    memory_budget,
+    spill_dir    ,
+    writer       ,
+):
+    run_paths   = []
+    row_bytes   = 0
+    first_write = True
+
+    while True:
+        with timed('read'):
+            chunk = next(chunks, None)
+
+        if chunk is None:
+            break
+
+        if transform:
+            with timed('transform'):
+                chunk = transform(chunk)
+
+        if sort_by:
+            with timed('sort'):
+                chunk = sort_chunk(chunk, sort_by)
+
+        if external:
+            if chunk.empty:
+                continue
+
+            with timed('spill'):
+                run_path = spill_dir / f'run-{len(run_paths):05}.parquet'
+                chunk.to_parquet(run_path, engine='pyarrow', index=False)
+
+            run_paths.append(run_path)
+            row_bytes = max(row_bytes, chunk.memory_usage(deep=True).sum() / len(chunk))
+        else:
+            with timed('write'):
+                write_chunk(chunk, parquet_path, first_write, writer)
+            first_write = False
+
+    if external:
+        batch_rows = int(memory_budget // (len(run_paths) + 2) // max(row_bytes, 1))
+
+        with timed('merge'):
+            merge_runs(
+                run_paths                             ,
+                parquet_path                          ,
+                sort_by                               ,
+                max(batch_rows, 1)                    ,
+                max(min(int(chunksize), batch_rows), 1),
+                writer                                ,
+            )
+
+        shutil.rmtree(spill_dir)
+
+
+def write_part(chunk, part_path):
+    tmp_path = part_path.with_name(part_path.name + '.tmp')
+
+    chunk.to_parquet(tmp_path, engine='pyarrow', index=False)
+    os.replace(tmp_path, part_path)
+
+
+def publish(tmp_path, parquet_path):
+    if parquet_path.is_dir():
+        shutil.rmtree(parquet_path)
+
+    os.replace(tmp_path, parquet_path)
+
+
+def finish_parts(
+    part_paths    ,
     parquet_path  ,
-    file_paths    ,
-    usecols       ,
     names         ,
     chunksize     ,
-    transform=None,
-    sort_by=None  ,
+    sort_by       ,
+    sort_mode     ,
+    memory_budget ,
+    schema        ,
+    partitions    ,
+    writer_options,
 ):
-    first_write = True
+    if part_paths and not (sort_by and sort_mode == 'external'):
+        with timed('concat'):
+            concat_parts(part_paths, parquet_path, partitions, writer_options, schema)
+    elif part_paths:
+        merge_parts(
+            part_paths    ,
+            parquet_path  ,
+            chunksize     ,
+            sort_by       ,
+            memory_budget ,
+            schema        ,
+            partitions    ,
+            writer_options,
+        )
 
-    for file_path in file_paths:
-        print(f"[Transform] Reading {file_path.name}")
+    if not parquet_path.exists():
+        write_empty(parquet_path, schema, names, partitions, writer_options)
 
-        chunks = pd.read_csv(
-            file_path          ,
-            sep=';'            ,
-            usecols=usecols    ,
-            names=names        ,
-            chunksize=chunksize,
-            low_memory=False   ,
-            encoding='latin-1' ,
-            on_bad_lines='skip',
-        )
 
-        for chunk in chunks:
+def merge_parts(
+    part_paths    ,
+    parquet_path  ,
+    chunksize     ,
+    sort_by       ,
+    memory_budget ,
+    schema        ,
+    partitions    ,
+    writer_options,
+):
+    batch_rows = int(memory_budget // (len(part_paths) + 2) // max(map(estimate_row_bytes, part_paths)))
+    writer     = open_writer(parquet_path, schema, partitions, writer_options)
+
+    try:
+        with timed('merge'):
+            merge_runs(
+                part_paths                            ,
+                parquet_path                          ,
+                sort_by                               ,
+                max(batch_rows, 1)                    ,
+                max(min(int(chunksize), batch_rows), 1),
+                writer                                ,
+            )
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def csv2parquet_checkpointed(
+    parquet_path               ,
+    file_paths                 ,
+    usecols                    ,
+    names                      ,
+    chunksize                  ,
+    transform=None             ,
+    sort_by=None               ,
+    sort_mode='chunk'          ,
+    memory_budget=2 * 1024 ** 3,
+    engine='pandas'            ,
+    schema=None                ,
+    partitions=None            ,
+    writer_options=None        ,
+    checkpoint_dir=None        ,
+):
+    checkpoint_dir = checkpoint_dir or parquet_path.with_name(f'{parquet_path.stem}.checkpoint')
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    run_path = checkpoint_dir / 'run.json'
+    config   = {
+        'sources'  : [str(path) for path in file_paths],
+        'chunksize': str(chunksize)                    ,
+    }
+
+    run = load_manifest(run_path)
+    if run.get('config') != config:
+        run = {'config': config, 'files': [], 'chunks': {}}
+
+    for source, file_path in enumerate(file_paths):
+        if file_path.name in run['files']:
+            print(f"[Transform] Already committed: {file_path.name}, skipping.")
+            continue
+
+        chunks = read_chunks([file_path], usecols, names, chunksize, engine)
+
+        for index in itertools.count():
+            with timed('read'):
+                chunk = next(chunks, None)
+
+            if chunk is None:
+                break
+
+            key   = f'{file_path.name}:{index:05}'
+            entry = run['chunks'].get(key)
+
+            if entry and (entry['part'] is None or (checkpoint_dir / entry['part']).exists()):
+                continue
+
             if transform:
-                chunk = transform(chunk)
+                with timed('transform'):
+                    chunk = transform(chunk)
 
             if sort_by:
-                chunk.sort_values(sort_by, inplace=True)
+                with timed('sort'):
+                    chunk = sort_chunk(chunk, sort_by)
+
+            part = None
+            if not chunk.empty:
+                part = f'chunk-{source:03}-{index:05}.parquet'
+
+                with timed('write'):
+                    write_part(chunk, checkpoint_dir / part)
+
+            run['chunks'][key] = {
+                'source': source    ,
+                'index' : index     ,
+                'part'  : part      ,
+                'rows'  : len(chunk),
+            }
+            save_manifest(run_path, run)
+
+        run['files'].append(file_path.name)
+        save_manifest(run_path, run)
+
+    part_paths = [
+        checkpoint_dir / entry['part']
+        for entry in sorted(run['chunks'].values(), key=lambda e: (e['source'], e['index']))
+        if entry['part'] is not None
+    ]
+
+    tmp_path = parquet_path.with_name(parquet_path.name + '.tmp')
+    finish_parts(
+        part_paths    ,
+        tmp_path      ,
+        names         ,
+        chunksize     ,
+        sort_by       ,
+        sort_mode     ,
+        memory_budget ,
+        schema        ,
+        partitions    ,
+        writer_options,
+    )
+    publish(tmp_path, parquet_path)
+
+    shutil.rmtree(checkpoint_dir)
+
+    return dict(TIMINGS)
+
+
+def convert_part(*args, **kwargs):
+    clear_timings()
+    csv2parquet(*args, **kwargs)
+
+    return dict(TIMINGS), dict(PEAK_RSS)
+
+
+def estimate_row_bytes(parquet_path, sample_rows=10_000):
+    batch = next(pq.ParquetFile(parquet_path).iter_batches(batch_size=sample_rows), None)
+    if batch is None:
+        return 1
+
+    df = batch.to_pandas()
+
+    return max(df.memory_usage(deep=True).sum() / max(len(df), 1), 1)
+
 
-            chunk.to_parquet(
-                parquet_path          ,
-                engine='fastparquet'  ,
-                index=False           ,
-                append=not first_write,
+def concat_parts(
+    part_paths         ,
+    parquet_path       ,
+    partitions=None    ,
+    writer_options=None,
+    schema=None        ,
+):
+    print(f"[Transform] Concatenating {len(part_paths)} part files into {parquet_path.name}")
+
+    schema = schema or pa.unify_schemas(
+        [pq.read_schema(path) for path in part_paths],
+        promote_options='permissive'                 ,
+    )
+
+    writer = open_writer(parquet_path, schema, partitions, writer_options)
+
+    try:
+        for path in part_paths:
+            part = pq.ParquetFile(path)
+
+            for i in range(part.num_row_groups):
+                writer.write_table(part.read_row_group(i).cast(schema))
+    finally:
+        writer.close()
+
+
+def csv2parquet_parallel(
+    parquet_path               ,
+    file_paths                 ,
+    usecols                    ,
+    names                      ,
+    chunksize                  ,
+    transform=None             ,
+    sort_by=None               ,
+    sort_mode='chunk'          ,
+    memory_budget=2 * 1024 ** 3,
+    workers=1                  ,
+    engine='pandas'            ,
+    schema=None                ,
+    partitions=None            ,
+    writer_options=None        ,
+    checkpoint=False           ,
+):
+    parts_dir = parquet_path.with_name(f'{parquet_path.stem}.parts')
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    part_paths = [
+        parts_dir / f'part-{i:03}.parquet'
+        for i in range(len(file_paths))
+    ]
+
+    part_chunksize = chunksize                                           \
+                     if isinstance(chunksize, int)                       \
+                     else ChunkSizer(chunksize.memory_budget // workers)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                convert_part                                   ,
+                part_path                                      ,
+                [file_path]                                    ,
+                usecols                                        ,
+                names                                          ,
+                part_chunksize                                 ,
+                transform=transform                            ,
+                sort_by=sort_by                                ,
+                sort_mode=sort_mode                            ,
+                memory_budget=memory_budget // workers         ,
+                spill_dir=parts_dir / f'{part_path.stem}.spill',
+                engine=engine                                  ,
+                schema=schema                                  ,
+                checkpoint=checkpoint                          ,
             )
+            for part_path, file_path in zip(part_paths, file_paths)
+            if not (checkpoint and part_path.exists())
+        ]
 
-            first_write = False
+        for future in futures:
+            merge_timings(*future.result())
+
+    part_paths = [path for path in part_paths if path.exists()]
+
+    tmp_path = parquet_path.with_name(parquet_path.name + '.tmp')
+    finish_parts(
+        part_paths    ,
+        tmp_path      ,
+        names         ,
+        chunksize     ,
+        sort_by       ,
+        sort_mode     ,
+        memory_budget ,
+        schema        ,
+        partitions    ,
+        writer_options,
+    )
+    publish(tmp_path, parquet_path)
+
+    shutil.rmtree(parts_dir)
+
+
+def key_prefixes(values, width, digits):
+    if pd.api.types.is_numeric_dtype(values):
+        prefixes = values // 10 ** (width - digits)
+    else:
+        prefixes = pd.to_numeric(values.str.slice(0, digits), errors='coerce')
+
+    return prefixes.fillna(10 ** digits).astype('int64')
+
+
+def dedupe_parquet(
+    parquet_path       ,
+    key                ,
+    width=8            ,
+    digits=2           ,
+    schema=None        ,
+    partitions=None    ,
+    writer_options=None,
+    output_path=None   ,
+):
+    source      = resolve_parquet(parquet_path)
+    output_path = output_path or source
+    spill_dir   = source.with_name(f'{source.stem}.dedupe')
+
+    if spill_dir.exists():
+        shutil.rmtree(spill_dir)
+    spill_dir.mkdir(parents=True)
+
+    print(f"[Transform] De-duplicating {source.name} on {key}")
+
+    with timed('dedupe spill'):
+        for i, table in enumerate(read_row_groups(source)):
+            df = table.to_pandas()
+
+            for prefix, part in df.groupby(key_prefixes(df[key], width, digits), sort=False):
+                part_dir = spill_dir / str(prefix)
+                part_dir.mkdir(exist_ok=True)
+
+                part.to_parquet(part_dir / f'run-{i:05}.parquet', engine='pyarrow', index=False)
+
+    tmp_path    = output_path.with_name(output_path.name + '.tmp')
+    writer      = open_writer(tmp_path, schema, partitions, writer_options)
+    first_write = True
+
+    try:
+        with timed('dedupe'):
+            for part_dir in sorted(spill_dir.iterdir(), key=lambda path: int(path.name)):
+                df = pd.concat(
+                    [pd.read_parquet(path) for path in sorted(part_dir.iterdir())],
+                    ignore_index=True                                             ,
+                )
+                df = df.drop_duplicates(key).sort_values(key, kind='stable', ignore_index=True)
+
+                write_chunk(df, tmp_path, first_write, writer)
+                first_write = False
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if not first_write:
+        publish(tmp_path, output_path)
+    elif output_path != source:
+        publish(source, output_path)
+
+    shutil.rmtree(spill_dir)
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+
+from .io        import resolve_parquet
+from .process   import timed
+from .constants import PARQUET_PARTNERS, \
+                       PAD_WIDTHS
+
+
+_partner_cnpjs = {}
+
+
+def load_partner_cnpjs(path=None):
+    path = path or resolve_parquet(PARQUET_PARTNERS)
+    key  = path, path.stat().st_mtime_ns
+
+    if key not in _partner_cnpjs:
+        with timed('partner set'):
+            cnpjs = pq.read_table(path, columns=['cnpj']).column('cnpj')
+            cnpjs = pc.unique(pc.cast(cnpjs, 'int64')).to_numpy(zero_copy_only=False)
+
+            _partner_cnpjs.clear()
+            _partner_cnpjs[key] = np.sort(cnpjs)
+
+    return _partner_cnpjs[key]
+
+
+def has_partner(cnpj, path=None):
+    cnpjs  = load_partner_cnpjs(path)
+    values = pd.to_numeric(cnpj, errors='coerce').fillna(-1).to_numpy('int64')
+
+    if not len(cnpjs):
+        return np.zeros(len(values), dtype=bool)
+
+    idx = np.searchsorted(cnpjs, values).clip(max=len(cnpjs) - 1)
+
+    return cnpjs[idx] == values
+
+
+def is_integer(series):
+    return pd.api.types.is_integer_dtype(series)
+
+
+def to_series(values, series):
+    return pd.Series(values.to_numpy(zero_copy_only=False), index=series.index)
+
+
+def zfill_digits(series, width):
+    if is_integer(series):
+        values = pc.cast(pa.array(series, from_pandas=True), pa.string())
+        return to_series(pc.utf8_lpad(values, width, '0'), series)
+
+    return series.astype(str).str.zfill(width)
+
+
+def to_numbers(series):
+    if not pd.api.types.is_object_dtype(series):
+        return pd.to_numeric(series, errors='coerce').to_numpy('float64')
+
+    values = pa.array(series, from_pandas=True, type=pa.string())
+    values = pc.if_else(pc.match_substring_regex(values, r'^[0-9]{1,18}$'), values, None)
+
+    return pc.cast(values, pa.int64()).to_numpy(zero_copy_only=False).astype('float64')
+
+
+def parse_yyyymmdd(series):
+    values = to_numbers(series)
+    valid  = ~np.isnan(values)
+    valid &= np.where(valid, values, 0) % 1 == 0
+
+    values = np.where(valid, values, 0).astype('int64')
+    year   = values // 10000
+    month  = values // 100 % 100
+    day    = values % 100
+
+    valid &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype('datetime64[M]')
+    dates  = months.astype('datetime64[D]') + np.where(valid, day - 1, 0)
+
+    valid &= dates.astype('datetime64[M]') == months
+    valid &= (dates >= np.datetime64(pd.Timestamp.min.ceil('D').date())) & \
+             (dates <= np.datetime64(pd.Timestamp.max.floor('D').date()))
+
+    return pd.Series(
+        np.where(valid, dates, np.datetime64('NaT')).astype('datetime64[ns]'),
+        index=series.index                                                   ,
+    )
+
+
+def clean_cep(series):
+    if is_integer(series) or pd.api.types.is_float_dtype(series):
+        return zfill_digits(series.fillna(0).astype('int64'), 8)
+
+    values = pa.array(series.fillna('0').astype(str), from_pandas=True)
+    values = pc.replace_substring(values, '-', '')
+    values = pc.replace_substring_regex(values, r'\..*$', '')
+
+    return to_series(pc.utf8_lpad(values, 8, '0'), series)
+
+
+def is_headquarters(series):
+    if is_integer(series):
+        return series == 1
+
+    if pd.api.types.is_object_dtype(series) and not series.hasnans:
+        values = pc.utf8_trim_whitespace(pa.array(series, from_pandas=True))
+        return to_series(pc.equal(values, '1'), series)
+
+    return series.astype(str).str.strip() == '1'
+
+
+def parse_capital(series):
+    values = pa.array(series, from_pandas=True)
+    values = pc.replace_substring_regex(values, r',.*', '')
+
+    return to_series(pc.cast(values, pa.int64()), series)
+
+
+def fn_partners(df):
+    df.dropna(inplace=True)
+
+    df.cnpj       = zfill_digits  (df.cnpj, 8)
+    df.start_date = parse_yyyymmdd(df.start_date)
+
+    return df
+
+
+def fn_companies(df):
+    df = df[has_partner(df.cnpj)].drop_duplicates('cnpj').copy()
+
+    df.cnpj    = zfill_digits (df.cnpj, 8)
+    df.capital = parse_capital(df.capital)
+
+    return df.reset_index(drop=True)
+
+
+def fn_business(df):
+    df = df[has_partner(df.cnpj)].copy()
+
+    df.branch = is_headquarters(df.branch)
+    df.cep    = clean_cep      (df.cep)
+
+    df.cnpj       = zfill_digits(df.cnpj      , 8)
+    df.cnpj_order = zfill_digits(df.cnpj_order, 4)
+    df.cnpj_dv    = zfill_digits(df.cnpj_dv   , 2)
+
+    df.closing_date = parse_yyyymmdd(df.closing_date)
+    df.opening_date = parse_yyyymmdd(df.opening_date)
+
+    return df.reset_index(drop=True)
+
+
+def pad_keys(df):
+    for col, width in PAD_WIDTHS.items():
+        if col in df and pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = zfill_digits(df[col].astype('Int64'), width)
+
+    return df
+
+
+def cnpj_prefix(table):
+    values = table['cnpj']
+
+    if pa.types.is_integer(values.type):
+        values = pc.utf8_lpad(pc.cast(values, pa.string()), 8, '0')
+
+    return pc.utf8_slice_codeunits(values, 0, 2)
+
+
+def start_year(table):
+    return pc.fill_null(pc.year(table['start_date']), 0)
+
+
+PARTITIONS_PARTNERS  = {'start_year' : start_year }
+PARTITIONS_COMPANIES = {'cnpj_prefix': cnpj_prefix}
+PARTITIONS_BUSINESS  = {'cnpj_prefix': cnpj_prefix}
@@ -1 +1,13 @@
-CACHE_TIMEOUT = 60 * 60
+CACHE_ALIAS = 'summarizer'
+CACHE_KEY   = 'dashboard_stats'
+
+CACHE_TIMEOUT       = 60 * 60
+CACHE_STALE_TIMEOUT = 24 * 60 * 60
+CACHE_LOCK_TIMEOUT  = 5 * 60
+
+DUCKDB_CONFIG = {
+    'memory_limit': '1GB',
+    'threads'     : 2    ,
+}
+
+TOP_CEP_PREFIXES = 10
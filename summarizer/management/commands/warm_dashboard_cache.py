@@ -0,0 +1,23 @@
+import time
+
+from django.db                   import DatabaseError
+from django.core.management.base import BaseCommand, \
+                                        CommandError
+
+from summarizer.stats import refresh_statistics
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard statistics and store them in the shared summarizer cache."
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        try:
+            entry = refresh_statistics()
+        except DatabaseError as error:
+            raise CommandError(f"{error}; create the cache table with 'manage.py createcachetable'") from error
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dashboard cache warmed from {entry['snapshot']} in {time.perf_counter() - start:.2f}s"
+        ))
@@ -0,0 +1,86 @@
+import os
+import time
+import duckdb
+import threading
+
+
+class DuckDBPool:
+    def __init__(self, path, config=None):
+        self.path   = path
+        self.config = config or {}
+
+        self.lock  = threading.Lock()
+        self.local = threading.local()
+
+        self.pid        = None
+        self.conn       = None
+        self.snapshot   = None
+        self.generation = 0
+
+        self.counters = {
+            'hits'      : 0  ,
+            'misses'    : 0  ,
+            'reopens'   : 0  ,
+            'queries'   : 0  ,
+            'query_time': 0.0,
+        }
+
+    def current_snapshot(self):
+        real_path = os.path.realpath(self.path)
+        stat      = os.stat(real_path)
+
+        return real_path, stat.st_ino, stat.st_mtime_ns
+
+    def connection(self):
+        snapshot = self.current_snapshot()
+
+        with self.lock:
+            if self.pid != os.getpid() or snapshot != self.snapshot:
+                if self.conn is not None and self.pid == os.getpid():
+                    self.counters['reopens'] += 1
+
+                # dropped rather than closed: closing it would also close other threads' cursors
+                self.conn       = duckdb.connect(snapshot[0], read_only=True, config=self.config)
+                self.pid        = os.getpid()
+                self.snapshot   = snapshot
+                self.generation += 1
+
+            return self.conn, self.generation
+
+    def cursor(self):
+        conn, generation = self.connection()
+        local            = self.local
+
+        if getattr(local, 'generation', None) == generation:
+            self.count('hits')
+            return local.cursor
+
+        if getattr(local, 'cursor', None) is not None and local.pid == os.getpid():
+            local.cursor.close()
+
+        local.cursor     = conn.cursor()
+        local.generation = generation
+        local.pid        = os.getpid()
+
+        self.count('misses')
+        return local.cursor
+
+    def execute(self, query, parameters=None):
+        cursor = self.cursor()
+
+        start  = time.perf_counter()
+        result = cursor.execute(query, parameters).fetchall()
+
+        with self.lock:
+            self.counters['queries']    += 1
+            self.counters['query_time'] += time.perf_counter() - start
+
+        return result
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
@@ -1,73 +1,182 @@
+import time
 import duckdb
+import logging
+import threading
 import pandas as pd
 
-from django.core.cache import cache
+from django.db         import DatabaseError, \
+                               connections
+from django.conf       import settings
+from django.core.cache import caches
 
 from scripts.constants    import DUCKDB_PATH
-from summarizer.constants import CACHE_TIMEOUT
+from scripts.aggregates   import DASHBOARD_QUERIES, \
+                                 ANALYTICS_COLUMNS, \
+                                 ANALYTICS_QUERY  , \
+                                 CAPITAL_QUANTILES, \
+                                 PARTNERS_CAP     , \
+                                 section_query
+from summarizer.pool      import DuckDBPool
+from summarizer.constants import CACHE_ALIAS        , \
+                                 CACHE_KEY          , \
+                                 CACHE_TIMEOUT      , \
+                                 CACHE_STALE_TIMEOUT, \
+                                 CACHE_LOCK_TIMEOUT , \
+                                 DUCKDB_CONFIG      , \
+                                 TOP_CEP_PREFIXES
+
+
+logger = logging.getLogger(__name__)
+
+POOL = DuckDBPool(
+    DUCKDB_PATH                                          ,
+    getattr(settings, 'SUMMARIZER_DUCKDB', DUCKDB_CONFIG),
+)
 
 
 def get_connection():
-    return duckdb.connect(DUCKDB_PATH, read_only=True)
+    return POOL
 
 
-def get_statistics():
-    if cached_stats := cache.get('dashboard_stats'):
-        return cached_stats
-
-    conn  = get_connection()
-    stats = {}
-
-    # =============
-    # 📊 Companies
-    # =============
-    stats['companies'] = conn.execute("""
-        SELECT 
-            COUNT(DISTINCT cnpj)   AS total_companies,
-            MIN(capital)           AS min_capital,
-            MAX(capital)           AS max_capital,
-            ROUND(AVG(capital), 2) AS avg_capital
-        FROM companies
-    """).fetchdf().to_dict(orient="records")[0]
-
-    # ============
-    # 📊 Partners
-    # ============
-    stats['partners'] = conn.execute("""
-        SELECT 
-            COUNT(DISTINCT name_partner) AS total_partners,
-            MIN(start_date)              AS earliest_partner_date,
-            MAX(start_date)              AS latest_partner_date
-        FROM partners
-    """).fetchdf().to_dict(orient="records")[0]
-
-    for field in [
-        'earliest_partner_date',
-        'latest_partner_date'
-    ]:
-        if  stats['partners'][field] is not None:
-            stats['partners'][field] = pd.to_datetime(stats['partners'][field]).date()
-
-    # ============
-    # 📊 Business
-    # ============
-    stats['business'] = conn.execute("""
-        SELECT 
-            COUNT(*)              AS total_business,
-            COUNT(DISTINCT cnpj)  AS unique_business,
-            MIN(opening_date)     AS earliest_opening,
-            MAX(opening_date)     AS latest_opening
-        FROM business
-    """).fetchdf().to_dict(orient="records")[0]
-
-    for field in [
-        'earliest_opening',
-        'latest_opening'
-    ]:
-        if  stats['business'][field] is not None:
-            stats['business'][field] = pd.to_datetime(stats['business'][field]).date()
+def read_dashboard_stats(pool):
+    try:
+        [row] = pool.execute(
+            f"SELECT {', '.join(DASHBOARD_QUERIES)} FROM dashboard_stats"
+        )
+    except duckdb.CatalogException:
+        return None
+
+    return dict(zip(DASHBOARD_QUERIES, row))
+
+
+def compute_dashboard_stats(pool):
+    return {
+        section: pool.execute(section_query(section))[0][0]
+        for section in DASHBOARD_QUERIES
+    }
+
+
+def read_dashboard_analytics(pool):
+    columns = ', '.join(ANALYTICS_COLUMNS)
 
-    cache.set('dashboard_stats', stats, CACHE_TIMEOUT)
-    conn .close()
+    try:
+        [row] = pool.execute(f"SELECT {columns} FROM dashboard_analytics")
+    except (duckdb.CatalogException, duckdb.BinderException):
+        [row] = pool.execute(f"SELECT {columns} FROM ({ANALYTICS_QUERY})")
+
+    return dict(zip(ANALYTICS_COLUMNS, row))
+
+
+def shape_analytics(analytics):
+    def items(histogram):
+        return sorted((histogram or {}).items(), key=lambda item: (item[0] is None, item[0]))
+
+    return {
+        'capital_quantiles'   : [
+            (f"p{round(quantile * 100)}", value)
+            for quantile, value in zip(CAPITAL_QUANTILES, analytics['capital_quantiles'] or [])
+        ],
+        'capital_histogram'   : [
+            (10 ** exponent if exponent else 0, 10 ** (exponent + 1) - 1, count)
+            for exponent, count in items(analytics['capital_histogram'])
+            if  exponent is not None
+        ],
+        'null_capital'        : analytics['null_capital'],
+        'opened_per_year'     : [
+            (year, count)
+            for year, count in items(analytics['opened_per_year'])
+            if  year is not None
+        ],
+        'active_business'     : analytics['active_business'],
+        'closed_business'     : analytics['closed_business'],
+        'cep_prefixes'        : sorted(
+            (item for item in (analytics['cep_prefixes'] or {}).items() if item[0] is not None),
+            key=lambda item: (-item[1], item[0]),
+        )[:TOP_CEP_PREFIXES],
+        'partner_distribution': [
+            (f"{partners}+" if partners == PARTNERS_CAP else str(partners), count)
+            for partners, count in items(analytics['partner_distribution'])
+        ],
+    }
+
+
+def compute_statistics():
+    pool  = get_connection()
+    stats = read_dashboard_stats(pool) or compute_dashboard_stats(pool)
+
+    stats['analytics'] = shape_analytics(read_dashboard_analytics(pool))
+
+    for section, fields in [
+        ('partners', ['earliest_partner_date', 'latest_partner_date']),
+        ('business', ['earliest_opening'     , 'latest_opening'     ]),
+    ]:
+        for field in fields:
+            if  stats[section][field] is not None:
+                stats[section][field] = pd.to_datetime(stats[section][field]).date()
 
     return stats
+
+
+def current_snapshot():
+    return get_connection().current_snapshot()[0]
+
+
+def is_fresh(entry):
+    return entry['expires_at'] > time.time() and entry['snapshot'] == current_snapshot()
+
+
+def refresh_statistics(cache=None):
+    cache = cache or caches[CACHE_ALIAS]
+    entry = {
+        'stats'     : compute_statistics()       ,
+        'snapshot'  : current_snapshot()         ,
+        'expires_at': time.time() + CACHE_TIMEOUT,
+    }
+    cache.set(CACHE_KEY, entry, CACHE_TIMEOUT + CACHE_STALE_TIMEOUT)
+
+    return entry
+
+
+def revalidate(cache, lock_key):
+    try:
+        refresh_statistics(cache)
+    finally:
+        cache.delete(lock_key)
+        connections.close_all()
+
+
+def refresh_in_background(cache, lock_key):
+    thread = threading.Thread(target=revalidate, args=(cache, lock_key), daemon=True)
+    thread.start()
+
+    return thread
+
+
+def cached_statistics(cache):
+    entry = cache.get(CACHE_KEY)
+
+    if entry and is_fresh(entry):
+        return entry['stats']
+
+    lock_key = f'{CACHE_KEY}:lock'
+
+    if not cache.add(lock_key, True, CACHE_LOCK_TIMEOUT):
+        return entry['stats'] if entry else None
+
+    # an expired entry of the live snapshot is served while it refreshes; one from an older snapshot is not
+    if entry and entry['snapshot'] == current_snapshot():
+        refresh_in_background(cache, lock_key)
+        return entry['stats']
+
+    try:
+        return refresh_statistics(cache)['stats']
+    finally:
+        cache.delete(lock_key)
+
+
+def get_statistics():
+    try:
+        return cached_statistics(caches[CACHE_ALIAS])
+    except DatabaseError:
+        logger.warning("The '%s' cache is unavailable, run 'manage.py createcachetable'", CACHE_ALIAS)
+        return cached_statistics(caches['default'])
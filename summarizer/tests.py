@@ -1,7 +1,29 @@
+import io
+import time
+import duckdb
+import tempfile
 import unittest
+import threading
 
-from django.test import Client
-from django.urls import reverse
+from pathlib       import Path
+from unittest.mock import patch
+
+from django.test             import Client, \
+                                    override_settings
+from django.urls             import reverse
+from django.core.cache       import caches
+from django.core.management  import call_command, \
+                                    CommandError
+
+from scripts.load         import swap_database
+from scripts.aggregates   import build_aggregates
+from summarizer           import stats as stats_module
+from summarizer.pool      import DuckDBPool
+from summarizer.stats     import get_statistics, \
+                                 read_dashboard_analytics
+from summarizer.constants import CACHE_ALIAS, \
+                                 CACHE_KEY  , \
+                                 DUCKDB_CONFIG
 
 
 class TestDashboardSummarizerView(unittest.TestCase):
@@ -31,3 +53,228 @@ class TestDashboardSummarizerView(unittest.TestCase):
         self.assertIn('companies', context)
         self.assertIn('partners' , context)
         self.assertIn('business' , context)
+
+
+class TestDashboardStatistics(unittest.TestCase):
+    def setUp(self):
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'rfb.duckdb'
+        self.pool = DuckDBPool(self.path, DUCKDB_CONFIG)
+
+        self.settings = override_settings(CACHES={
+            'default'  : {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            CACHE_ALIAS: {
+                'BACKEND' : 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'summarizer-tests'                             ,
+            },
+        })
+        self.settings.enable()
+
+        self.cache = caches[CACHE_ALIAS]
+        self.cache.clear()
+
+        self.patcher = patch('summarizer.stats.POOL', self.pool)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.cache.clear()
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def build(self, version, aggregates=False, companies=1000):
+        version_path = self.path.with_name(f'rfb-{version}.duckdb')
+
+        with duckdb.connect(version_path) as conn:
+            conn.execute("""
+                CREATE TABLE companies AS
+                SELECT lpad(CAST(range AS VARCHAR), 8, '0') AS cnpj, range * 100 AS capital
+                FROM range(?)
+            """, [companies])
+            conn.execute("""
+                CREATE TABLE partners AS
+                SELECT lpad(CAST(range % 1000 AS VARCHAR), 8, '0') AS cnpj,
+                       'PARTNER ' || (range % 700)                 AS name_partner,
+                       DATE '2000-01-01' + CAST(range AS INTEGER)  AS start_date
+                FROM range(3000)
+            """)
+            conn.execute("""
+                CREATE TABLE business AS
+                SELECT lpad(CAST(range % 1000 AS VARCHAR), 8, '0')                  AS cnpj,
+                       DATE '1990-01-01' + CAST(range AS INTEGER)                   AS opening_date,
+                       CASE WHEN range % 4 = 0 THEN DATE '2020-01-01' END           AS closing_date,
+                       lpad(CAST(range % 5 AS VARCHAR), 3, '0') || '12345'          AS cep
+                FROM range(2000)
+            """)
+
+            if aggregates:
+                build_aggregates(conn)
+                conn.execute('DELETE FROM partners')
+
+        swap_database(version_path, self.path)
+
+    def test_materialised_stats_match_live_queries(self):
+        self.build(1)
+        live = get_statistics()
+
+        self.assertEqual(live['companies']['total_companies'], 1000)
+        self.assertEqual(live['partners' ]['total_partners' ], 700 )
+        self.assertEqual(live['business' ]['unique_business'], 1000)
+
+        self.cache.clear()
+        self.build(2, aggregates=True)
+
+        self.assertEqual(get_statistics(), live)
+        self.assertEqual(self.pool.stats()['reopens'], 1)
+
+    def test_reads_snapshot_table_when_present(self):
+        self.build(1, aggregates=True)
+
+        self.assertEqual(get_statistics()['partners']['total_partners'], 700)
+        self.assertEqual(self.pool.execute('SELECT COUNT(*) FROM partners'), [(0,)])
+
+    def test_analytics_are_cached_with_stats(self):
+        self.build(1)
+        analytics = get_statistics()['analytics']
+
+        self.assertEqual(analytics['active_business'], 1500)
+        self.assertEqual(analytics['closed_business'], 500 )
+        self.assertEqual(analytics['partner_distribution'], [('3', 1000)])
+        self.assertEqual(analytics['cep_prefixes'], [(f'00{i}', 400) for i in range(5)])
+        self.assertEqual(analytics['capital_quantiles'][2], ('p50', 49950.0))
+        self.assertEqual(analytics['capital_histogram'][0], (0, 9, 1))
+        self.assertEqual(analytics['null_capital'], 0)
+        self.assertEqual(sum(count for _, count in analytics['opened_per_year']), 2000)
+
+        self.assertEqual(get_statistics()['analytics'], analytics)
+
+    def test_companies_without_partners_are_counted(self):
+        self.build(1, companies=1200)
+
+        self.assertEqual(
+            get_statistics()['analytics']['partner_distribution'],
+            [('0', 200), ('3', 1000)]                             ,
+        )
+
+    def test_materialised_analytics_match_live_query(self):
+        self.build(1)
+        live = read_dashboard_analytics(self.pool)
+
+        self.build(2, aggregates=True)
+
+        self.assertEqual(read_dashboard_analytics(self.pool), live)
+
+    def test_cursors_are_reused_per_thread(self):
+        self.build(1)
+
+        def work():
+            for _ in range(3):
+                self.pool.execute('SELECT COUNT(*) FROM companies')
+
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = self.pool.stats()
+        self.assertEqual(stats['misses'] , 2)
+        self.assertEqual(stats['hits']   , 4)
+        self.assertEqual(stats['queries'], 6)
+        self.assertGreater(stats['query_time'], 0)
+
+        old = self.pool.cursor()
+        self.build(2)
+
+        self.assertIsNot(self.pool.cursor(), old)
+        self.assertEqual(self.pool.stats()['reopens'], 1)
+
+    def test_new_snapshot_invalidates_cache(self):
+        self.build(1)
+        self.assertEqual(get_statistics()['companies']['total_companies'], 1000)
+
+        self.build(2, companies=500)
+        self.assertEqual(get_statistics()['companies']['total_companies'], 500)
+
+    def test_stale_entry_is_served_while_locked(self):
+        self.build(1)
+        stats = get_statistics()
+
+        entry = self.cache.get(CACHE_KEY)
+        self.cache.set(CACHE_KEY, {**entry, 'expires_at': 0})
+        self.cache.add(f'{CACHE_KEY}:lock', True)
+
+        with patch('summarizer.stats.compute_statistics') as compute:
+            self.assertEqual(get_statistics(), stats)
+            compute.assert_not_called()
+
+        self.cache.delete(f'{CACHE_KEY}:lock')
+
+        threads = []
+        refresh = stats_module.refresh_in_background
+
+        def refresh_in_background(*args):
+            threads.append(refresh(*args))
+
+        with patch('summarizer.stats.compute_statistics', return_value={'refreshed': True}) as compute, \
+             patch('summarizer.stats.refresh_in_background', refresh_in_background):
+            self.assertEqual(get_statistics(), stats)
+
+            [thread] = threads
+            thread.join()
+            compute.assert_called_once()
+
+        self.assertEqual(self.cache.get(CACHE_KEY)['stats'], {'refreshed': True})
+        self.assertIsNone(self.cache.get(f'{CACHE_KEY}:lock'))
+
+    def test_single_flight_recompute(self):
+        self.build(1)
+        stats = get_statistics()
+        self.cache.clear()
+
+        calls = []
+
+        def slow_compute():
+            calls.append(threading.get_ident())
+            time.sleep(0.5)
+            return stats
+
+        results = []
+
+        def work():
+            results.append(get_statistics())
+
+        with patch('summarizer.stats.compute_statistics', slow_compute):
+            threads = [threading.Thread(target=work) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results, key=bool), [None] * 4 + [stats])
+        self.assertEqual(get_statistics(), stats)
+
+    def test_missing_cache_table_falls_back_to_default_cache(self):
+        self.build(1)
+
+        with override_settings(CACHES={
+            'default'  : {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            CACHE_ALIAS: {
+                'BACKEND' : 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': 'summarizer_missing_cache_table'             ,
+            },
+        }):
+            self.assertEqual(get_statistics()['companies']['total_companies'], 1000)
+            self.assertIsNotNone(caches['default'].get(CACHE_KEY))
+
+            with self.assertRaises(CommandError):
+                call_command('warm_dashboard_cache', stdout=io.StringIO())
+
+    def test_warm_command_fills_cache(self):
+        self.build(1)
+        call_command('warm_dashboard_cache', stdout=io.StringIO())
+
+        entry = self.cache.get(CACHE_KEY)
+        self.assertEqual(entry['stats']['companies']['total_companies'], 1000)
+        self.assertEqual(entry['snapshot'], str(self.path.with_name('rfb-1.duckdb').resolve()))
@@ -0,0 +1,287 @@
+import os
+import json
+import queue
+import hashlib
+import multiprocessing
+import zipfile
+import tempfile
+import threading
+import unittest
+
+from pathlib     import Path
+from http.server import ThreadingHTTPServer, \
+                        BaseHTTPRequestHandler
+
+from scripts.io import download_file    , \
+                       downloader_worker, \
+                       clean_tmp_dir    , \
+                       extractor_worker , \
+                       new_state        , \
+                       save_state
+from scripts.manifest import load_manifest
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        etag = f'"{hashlib.md5(self.server.payload).hexdigest()}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(self.server.payload)))
+        if self.server.last_modified:
+            self.send_header('Last-Modified', self.server.last_modified)
+        if self.server.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+    def do_GET(self):
+        payload = self.server.payload
+        header  = self.headers.get('Range')
+
+        if not (self.server.ranges and header):
+            self.server.served += len(payload)
+
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        start, end = header.removeprefix('bytes=').split('-')
+        start, end = int(start), int(end)
+
+        if start >= self.server.fail_from or self.server.failures:
+            self.server.failures = max(self.server.failures - 1, 0)
+            self.send_error(503)
+            return
+
+        body = payload[start:end + 1]
+        self.server.served += len(body)
+        self.server.ranges_served += 1
+
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{end}/{len(payload)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestRangedDownload(unittest.TestCase):
+    SEGMENT = 64 * 1024
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.server.payload       = os.urandom(10 * self.SEGMENT + 123)
+        self.server.ranges        = True
+        self.server.fail_from     = float('inf')
+        self.server.failures      = 0
+        self.server.served        = 0
+        self.server.ranges_served = 0
+        self.server.last_modified = None
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.dest = Path(self.tmp.name) / 'file.zip'
+        self.url  = f'http://127.0.0.1:{self.server.server_port}/file.zip'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def download(self, **kwargs):
+        download_file(
+            self.url                 ,
+            self.dest                ,
+            chunk_size=4096          ,
+            workers=4                ,
+            segment_size=self.SEGMENT,
+            **kwargs                 ,
+        )
+
+    def test_ranged_download_matches_source(self):
+        self.download()
+
+        self.assertEqual(self.dest.read_bytes(), self.server.payload)
+        self.assertEqual(self.server.ranges_served, 11)
+        self.assertFalse(self.dest.with_name('file.zip.state').exists())
+
+    def test_interrupted_download_resumes_from_state(self):
+        self.server.fail_from = 5 * self.SEGMENT
+
+        with self.assertRaises(Exception):
+            self.download(retries=0)
+
+        state_path = self.dest.with_name('file.zip.state')
+        self.assertTrue(state_path.exists())
+
+        self.server.fail_from = float('inf')
+        self.server.served    = 0
+        self.download()
+
+        self.assertEqual(self.dest.read_bytes(), self.server.payload)
+        self.assertLessEqual(self.server.served, len(self.server.payload) - 5 * self.SEGMENT)
+        self.assertFalse(state_path.exists())
+
+    def test_clean_tmp_dir_keeps_incomplete_downloads(self):
+        self.server.fail_from = 5 * self.SEGMENT
+
+        with self.assertRaises(Exception):
+            self.download(retries=0)
+
+        tmp_dir  = self.dest.parent
+        finished = tmp_dir / 'other.zip'
+        finished.write_bytes(b'done')
+
+        self.assertEqual(clean_tmp_dir(tmp_dir), [self.dest])
+        self.assertFalse(finished.exists())
+        self.assertTrue(self.dest.with_name('file.zip.state').exists())
+
+        self.server.fail_from = float('inf')
+        self.download()
+
+        self.assertEqual(self.dest.read_bytes(), self.server.payload)
+        self.assertEqual(clean_tmp_dir(tmp_dir), [])
+        self.assertFalse(tmp_dir.exists())
+
+    def test_partial_segment_resumes_at_offset(self):
+        payload = self.server.payload
+        state   = new_state(self.url, len(payload), self.SEGMENT)
+
+        with open(self.dest, 'wb') as f:
+            f.truncate(len(payload))
+            f.write(payload[:1000])
+        state['segments'][0][2] = 1000
+
+        save_state(self.dest.with_name('file.zip.state'), state)
+        self.download()
+
+        self.assertEqual(self.dest.read_bytes(), payload)
+        self.assertEqual(self.server.served, len(payload) - 1000)
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        self.server.failures = 3
+        self.download(retries=3, backoff=0.01)
+
+        self.assertEqual(self.dest.read_bytes(), self.server.payload)
+        self.assertEqual(self.server.failures, 0)
+
+    def test_progress_is_checkpointed_every_checkpoint_size(self):
+        self.server.fail_from = 5 * self.SEGMENT
+
+        with self.assertRaises(Exception):
+            self.download(retries=0, checkpoint_size=self.SEGMENT // 4)
+
+        state = json.loads(self.dest.with_name('file.zip.state').read_text())
+
+        self.assertEqual([done for *_, done in state['segments'][:5]], [self.SEGMENT] * 5)
+        self.assertEqual(self.dest.read_bytes()[:5 * self.SEGMENT], self.server.payload[:5 * self.SEGMENT])
+
+    def test_falls_back_to_single_stream_without_ranges(self):
+        self.server.ranges = False
+        self.download()
+
+        self.assertEqual(self.dest.read_bytes(), self.server.payload)
+        self.assertEqual(self.server.ranges_served, 0)
+
+    def run_worker(self, manifest_path):
+        downloader_worker(
+            f'http://127.0.0.1:{self.server.server_port}/2025-08/',
+            'Socios'                                             ,
+            1                                                    ,
+            self.dest.parent                                     ,
+            self.dest.parent                                     ,
+            manifest_path=manifest_path                          ,
+            manifest_lock=multiprocessing.Lock()                 ,
+        )
+
+    def test_manifest_skips_unchanged_files(self):
+        manifest_path = self.dest.parent / 'manifest.json'
+
+        self.run_worker(manifest_path)
+
+        entry = load_manifest(manifest_path)['files']['Socios0.zip']
+        self.assertEqual(entry['snapshot'], '2025-08')
+        self.assertEqual(entry['size']    , len(self.server.payload))
+        self.assertEqual(entry['sha256']  , hashlib.sha256(self.server.payload).hexdigest())
+
+        self.server.served = 0
+        self.run_worker(manifest_path)
+        self.assertEqual(self.server.served, 0)
+
+        self.server.payload = os.urandom(len(self.server.payload))
+        self.run_worker(manifest_path)
+
+        zip_path = self.dest.parent / 'Socios0.zip'
+        self.assertEqual(zip_path.read_bytes(), self.server.payload)
+        self.assertEqual(
+            load_manifest(manifest_path)['files']['Socios0.zip']['sha256'],
+            hashlib.sha256(self.server.payload).hexdigest()               ,
+        )
+
+    def test_manifest_adopts_outputs_newer_than_remote(self):
+        manifest_path = self.dest.parent / 'manifest.json'
+        zip_path      = self.dest.parent / 'Socios0.zip'
+        zip_path.write_bytes(self.server.payload)
+
+        self.server.last_modified = 'Mon, 04 Aug 2025 10:00:00 GMT'
+        self.run_worker(manifest_path)
+
+        entry = load_manifest(manifest_path)['files']['Socios0.zip']
+        self.assertEqual(self.server.served   , 0                                              )
+        self.assertEqual(entry['last_modified'], self.server.last_modified                     )
+        self.assertEqual(entry['sha256']       , hashlib.sha256(self.server.payload).hexdigest())
+
+    def test_manifest_downloads_outputs_older_than_remote(self):
+        manifest_path = self.dest.parent / 'manifest.json'
+        zip_path      = self.dest.parent / 'Socios0.zip'
+        zip_path.write_bytes(b'stale')
+        os.utime(zip_path, (1_700_000_000, 1_700_000_000))
+
+        self.server.last_modified = 'Mon, 04 Aug 2025 10:00:00 GMT'
+        self.run_worker(manifest_path)
+
+        self.assertEqual(zip_path.read_bytes(), self.server.payload)
+        self.assertEqual(self.server.served   , len(self.server.payload))
+
+
+class TestExtractorWorker(unittest.TestCase):
+    def test_extracts_removes_archive_and_reports_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+
+            task_queue  = queue.Queue(maxsize=2)
+            stats_queue = queue.Queue()
+
+            zip_path = tmp / 'Socios0.zip'
+            csv_path = tmp / 'socios0.csv'
+
+            with zipfile.ZipFile(zip_path, 'w') as zf:
+                zf.writestr('K3241.K03200Y0.D50712.SOCIOCSV', b'"1";"2"\n' * 100)
+
+            task_queue.put((zip_path, csv_path, None))
+            task_queue.put(None)
+
+            extractor_worker(task_queue, stats_queue)
+
+            self.assertEqual(csv_path.read_bytes(), b'"1";"2"\n' * 100)
+            self.assertFalse(zip_path.exists())
+
+            stage, nbytes, start, end = stats_queue.get_nowait()
+            self.assertEqual(stage , 'extract')
+            self.assertEqual(nbytes, 800)
+            self.assertLessEqual(start, end)
+
+
+if __name__ == '__main__':
+    unittest.main()
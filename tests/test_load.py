@@ -0,0 +1,645 @@
+import os
+import time
+import duckdb
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pathlib import Path
+
+from scripts.load      import insert_parquet     , \
+                              configure_bulk_load, \
+                              create_tables      , \
+                              create_indexes     , \
+                              load_duckdb_table  , \
+                              verify_database    , \
+                              optimize_database  , \
+                              swap_database      , \
+                              prune_versions     , \
+                              list_versions      , \
+                              build_fts          , \
+                              create_fts
+from scripts.process   import write_dataset_metadata
+from scripts.aggregates import ANALYTICS_QUERY  , \
+                               ANALYTICS_COLUMNS, \
+                               PARTNERS_CAP     , \
+                               build_aggregates
+from scripts.constants import SCHEMA_PARTNERS   , \
+                              SCHEMA_COMPANIES  , \
+                              SCHEMA_BUSINESS   , \
+                              SQLITE_FTS_OPTIONS
+
+
+def make_business(nrows, seed=0):
+    rng   = np.random.default_rng(seed)
+    dates = pd.to_datetime('1990-01-01') + pd.to_timedelta(rng.integers(0, 12_000, nrows), unit='D')
+
+    return pd.DataFrame({
+        'cnpj'        : [f'{v:08}' for v in rng.integers(0, 99_999_999, nrows)],
+        'cnpj_order'  : [f'{v:04}' for v in rng.integers(1, 9_999, nrows)]     ,
+        'cnpj_dv'     : [f'{v:02}' for v in rng.integers(0, 99, nrows)]        ,
+        'branch'      : rng.integers(0, 2, nrows).astype(bool)                  ,
+        'trade_name'  : rng.choice(['PADARIA SÃO JOÃO', 'AÇOUGUE', None], nrows),
+        'closing_date': dates.where(rng.random(nrows) < 0.3)                   ,
+        'opening_date': dates                                                  ,
+        'cep'         : [f'{v:08}' for v in rng.integers(0, 99_999_999, nrows)],
+    })
+
+
+def legacy_insert(conn, table_name, parquet_path):
+    df = pd.read_parquet(parquet_path)
+
+    for col in df.select_dtypes(include=["datetime64[ns]"]):
+        df[col] = df[col].dt.strftime("%Y-%m-%d")
+
+    df.to_sql(table_name, conn, index=False, if_exists='append')
+
+
+class TestBulkLoad(unittest.TestCase):
+    CREATE = '''
+        CREATE TABLE business (
+            cnpj TEXT,
+            cnpj_order TEXT,
+            cnpj_dv TEXT,
+            branch BOOLEAN,
+            trade_name TEXT,
+            closing_date TEXT,
+            opening_date TEXT,
+            cep TEXT,
+            PRIMARY KEY (cnpj, cnpj_order, cnpj_dv)
+        )
+    '''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+        df = make_business(200_000).drop_duplicates(['cnpj', 'cnpj_order', 'cnpj_dv'])
+        df.to_parquet(self.dir / 'business.parquet', engine='fastparquet', index=False, row_group_offsets=50_000)
+
+        compact = df.assign(**{
+            col: df[col].astype('int64')
+            for col in ('cnpj', 'cnpj_order', 'cnpj_dv', 'cep')
+        })
+        compact.to_parquet(self.dir / 'compact.parquet', schema=SCHEMA_BUSINESS, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, name, loader, parquet_name, bulk=False):
+        conn = sqlite3.connect(self.dir / f'{name}.sqlite3')
+        conn.execute(self.CREATE)
+        conn.commit()
+
+        start = time.perf_counter()
+
+        if bulk:
+            configure_bulk_load(conn)
+            conn.execute('BEGIN')
+
+        loader(conn, 'business', self.dir / parquet_name)
+        conn.commit()
+
+        elapsed = time.perf_counter() - start
+        rows    = conn.execute('SELECT * FROM business ORDER BY cnpj, cnpj_order, cnpj_dv').fetchall()
+        conn.close()
+
+        return rows, elapsed
+
+    def test_bulk_load_matches_to_sql(self):
+        expected, t_legacy  = self.load('legacy' , legacy_insert , 'business.parquet')
+        result  , t_bulk    = self.load('bulk'   , insert_parquet, 'business.parquet', bulk=True)
+        compact , t_compact = self.load('compact', insert_parquet, 'compact.parquet' , bulk=True)
+
+        print()
+        print(f"to_sql      - Execution time: {t_legacy :.6f} seconds")
+        print(f"executemany - Execution time: {t_bulk   :.6f} seconds")
+        print(f"compact     - Execution time: {t_compact:.6f} seconds")
+
+        self.assertEqual(expected, result)
+        self.assertEqual(expected, compact)
+
+
+class TestDatabaseSwap(unittest.TestCase):
+    def setUp(self):
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.dir  = Path(self.tmp.name)
+        self.path = self.dir / 'rfb.sqlite3'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, version, rows):
+        path = self.dir / f'rfb-{version}.sqlite3'
+
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE companies (cnpj TEXT PRIMARY KEY, corporate_name TEXT)')
+        conn.execute('CREATE VIRTUAL TABLE companies_fts USING fts5(corporate_name, content="companies", content_rowid="rowid")')
+        conn.executemany('INSERT INTO companies VALUES (?, ?)', rows)
+        conn.execute('INSERT INTO companies_fts(rowid, corporate_name) SELECT rowid, corporate_name FROM companies')
+        conn.commit()
+
+        verify_database(conn, ('companies',))
+        optimize_database(conn, ('companies_fts',))
+        conn.close()
+
+        return path
+
+    def reader(self):
+        return sqlite3.connect(f'file:{self.path.as_posix()}?mode=ro&cache=shared', uri=True)
+
+    def names(self, conn):
+        return conn.execute('SELECT corporate_name FROM companies ORDER BY cnpj').fetchall()
+
+    def test_readers_pick_up_new_snapshot(self):
+        swap_database(self.build('20250701T000000', [('00000001', 'OLD')]), self.path)
+        old = self.reader()
+
+        swap_database(self.build('20250801T000000', [('00000001', 'NEW')]), self.path)
+        new = self.reader()
+
+        self.assertEqual(self.names(old), [('OLD',)])
+        self.assertEqual(self.names(new), [('NEW',)])
+
+        old.close()
+        new.close()
+
+    def test_swap_keeps_legacy_file_as_version(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE companies (cnpj TEXT PRIMARY KEY, corporate_name TEXT)')
+        conn.execute("INSERT INTO companies VALUES ('00000001', 'LEGACY')")
+        conn.commit()
+        conn.close()
+        os.utime(self.path, (1_700_000_000, 1_700_000_000))
+
+        swap_database(self.build('20250701T000000', [('00000001', 'NEW')]), self.path)
+
+        [legacy, current] = list_versions(self.path)
+        self.assertEqual(current, self.path.resolve())
+        self.assertEqual(legacy.name, time.strftime('rfb-%Y%m%dT%H%M%S.sqlite3', time.localtime(1_700_000_000)))
+
+        conn = sqlite3.connect(legacy)
+        self.assertEqual(self.names(conn), [('LEGACY',)])
+        conn.close()
+
+    def test_swap_replaces_legacy_file_and_prunes_versions(self):
+        sqlite3.connect(self.path).close()
+        os.utime(self.path, (1_700_000_000, 1_700_000_000))
+
+        for month in range(1, 5):
+            swap_database(self.build(f'20250{month}01T000000', [('00000001', str(month))]), self.path)
+            prune_versions(self.path, keep=2)
+
+        self.assertTrue(self.path.is_symlink())
+        self.assertEqual(
+            [version.name for version in list_versions(self.path)]      ,
+            ['rfb-20250301T000000.sqlite3', 'rfb-20250401T000000.sqlite3'],
+        )
+
+    def test_verify_rejects_empty_tables(self):
+        conn = sqlite3.connect(self.dir / 'empty.sqlite3')
+        conn.execute('CREATE TABLE companies (cnpj TEXT)')
+
+        with self.assertRaises(RuntimeError):
+            verify_database(conn, ('companies',))
+
+        conn.close()
+
+
+class TestParallelFTS(unittest.TestCase):
+    FTS = {
+        'business_fts': ('business', 'trade_name'),
+        'cep_fts'     : ('business', 'cep')       ,
+    }
+
+    def setUp(self):
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'rfb.sqlite3'
+
+        conn = sqlite3.connect(self.path)
+        conn.execute(TestBulkLoad.CREATE)
+        make_business(50_000).drop_duplicates(['cnpj', 'cnpj_order', 'cnpj_dv']) \
+                             .astype({'closing_date': str, 'opening_date': str})  \
+                             .to_sql('business', conn, index=False, if_exists='append')
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def matches(self, conn):
+        return [
+            conn.execute(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ? ORDER BY rowid", (query,)).fetchall()
+            for fts_table, query in (('business_fts', 'PADARIA'), ('business_fts', 'Joã*'), ('cep_fts', '1*'))
+        ]
+
+    def test_parallel_build_matches_serial(self):
+        serial = sqlite3.connect(':memory:')
+        serial.execute('ATTACH DATABASE ? AS src', (str(self.path),))
+        serial.execute(TestBulkLoad.CREATE)
+        serial.execute('INSERT INTO business SELECT * FROM src.business')
+
+        for fts_table, (table, column) in self.FTS.items():
+            create_fts(serial, fts_table, table, column)
+            serial.execute(f'INSERT INTO {fts_table}(rowid, {column}) SELECT rowid, {column} FROM {table}')
+
+        serial.commit()
+        serial.execute('DETACH DATABASE src')
+
+        conn = build_fts(self.path, self.FTS, workers=2)
+
+        for fts_table in self.FTS:
+            conn.execute(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES('integrity-check', 1)")
+
+        self.assertTrue(all(self.matches(conn)))
+        self.assertEqual(self.matches(conn), self.matches(serial))
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [self.path])
+
+        conn.close()
+        serial.close()
+
+
+class TestFTSOptions(unittest.TestCase):
+    WORDS = [
+        'JOÃO', 'JOAO', 'JOSÉ', 'JOSEFA', 'JORGE', 'MARIA', 'MÁRCIO', 'MARCOS', 'ANTÔNIO', 'ANA',
+        'SILVA', 'SOUZA', 'SANTOS', 'OLIVEIRA', 'COMÉRCIO', 'COMERCIAL', 'PADARIA', 'AÇOUGUE',
+        'SERVIÇOS', 'TRANSPORTES', 'CONSTRUÇÕES', 'ALIMENTOS', 'LTDA', 'EIRELI', 'ME',
+    ]
+    CONFIGS = {
+        'default'            : {}                     ,
+        'prefix 2 3 4'       : {'prefix': '2 3 4'}    ,
+        'prefix 1 2 3 4'     : {'prefix': '1 2 3 4'}  ,
+        'prefix + diacritics': SQLITE_FTS_OPTIONS     ,
+        'trigram'            : {'tokenize': 'trigram'},
+    }
+    PREFIXES = ['J', 'M', 'JO', 'MA', 'JOS', 'COME']
+
+    @classmethod
+    def setUpClass(cls):
+        rng     = np.random.default_rng(0)
+        letters = np.array(list('ABCDEFGHIJLMNOPRSTUVZ'))
+        vocab   = [
+            ''.join(rng.choice(letters, rng.integers(3, 10)))
+            for _ in range(100_000)
+        ] + cls.WORDS
+        words   = rng.choice(vocab, (200_000, 4))
+
+        cls.conn = sqlite3.connect(':memory:')
+        cls.conn.execute('CREATE TABLE companies (cnpj TEXT PRIMARY KEY, corporate_name TEXT)')
+        cls.conn.executemany(
+            'INSERT INTO companies VALUES (?, ?)',
+            ((f'{i:08}', ' '.join(row)) for i, row in enumerate(words)),
+        )
+
+        for i, options in enumerate(cls.CONFIGS.values()):
+            create_fts(cls.conn, f'fts_{i}', 'companies', 'corporate_name', options)
+            cls.conn.execute(f'INSERT INTO fts_{i}(rowid, corporate_name) SELECT rowid, corporate_name FROM companies')
+            cls.conn.execute(f"INSERT INTO fts_{i}(fts_{i}) VALUES('optimize')")
+
+        cls.conn.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def search(self, config, prefix, limit=-1):
+        i = list(self.CONFIGS).index(config)
+
+        if config == 'trigram':
+            where, param = 'corporate_name LIKE ?', f'{prefix}%'
+        else:
+            where, param = f'fts_{i} MATCH ?', f'{prefix}*'
+
+        return self.conn.execute(
+            f'SELECT rowid FROM fts_{i} WHERE {where} ORDER BY rowid LIMIT ?',
+            (param, limit)                                                   ,
+        ).fetchall()
+
+    def rowids(self, word):
+        return {
+            (rowid,)
+            for rowid, name in self.conn.execute('SELECT rowid, corporate_name FROM companies')
+            if word in name.split()
+        }
+
+    def test_prefix_indexes_match_default(self):
+        for prefix in self.PREFIXES:
+            expected = self.search('default', prefix)
+
+            self.assertEqual(expected, self.search('prefix 2 3 4'  , prefix))
+            self.assertEqual(expected, self.search('prefix 1 2 3 4', prefix))
+
+    def test_diacritics_are_folded(self):
+        joao   = set(self.search('prefix + diacritics', 'Joao'))
+        accent = set(self.search('prefix + diacritics', 'João'))
+
+        self.assertEqual(joao, accent)
+        self.assertLessEqual(self.rowids('JOÃO') | self.rowids('JOAO'), joao)
+
+    def test_short_prefix_latency(self):
+        for label, limit in (('all matches', -1), ('first page', 20)):
+            print()
+            print(f"{label:<20}" + ''.join(f'{prefix:>9}' for prefix in self.PREFIXES))
+
+            for config in self.CONFIGS:
+                timings = []
+                for prefix in self.PREFIXES:
+                    start = time.perf_counter()
+                    for _ in range(5):
+                        self.search(config, prefix, limit)
+                    timings.append((time.perf_counter() - start) / 5 * 1000)
+
+                print(f'{config:<20}' + ''.join(f'{t:>7.2f}ms' for t in timings))
+
+class TestCompactSchema(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.dir = Path(cls.tmp.name)
+
+        rng      = np.random.default_rng(1)
+        business = make_business(200_000).drop_duplicates(['cnpj', 'cnpj_order', 'cnpj_dv'])
+        cnpjs    = business['cnpj'].drop_duplicates()
+
+        companies = pd.DataFrame({
+            'cnpj'          : cnpjs                                                 ,
+            'corporate_name': rng.choice(['COMERCIO LTDA', 'JOÃO SILVA ME'], len(cnpjs)),
+            'capital'       : rng.integers(0, 1_000_000, len(cnpjs))                ,
+        })
+        partners = pd.DataFrame({
+            'cnpj'        : rng.choice(cnpjs, 300_000)                                ,
+            'name_partner': rng.choice(['MARIA SOUZA', 'JOSÉ SANTOS'], 300_000)        ,
+            'start_date'  : pd.to_datetime('2000-01-01') + pd.to_timedelta(rng.integers(0, 9_000, 300_000), unit='D'),
+        })
+
+        cls.cnpjs  = rng.choice(cnpjs, 500).tolist()
+        cls.sizes  = {}
+        cls.conns  = {}
+        cls.timing = {}
+
+        for compact in (False, True):
+            tables = {'companies': companies, 'partners': partners, 'business': business}
+            schema = {'companies': SCHEMA_COMPANIES, 'partners': SCHEMA_PARTNERS, 'business': SCHEMA_BUSINESS}
+
+            path = cls.dir / f'rfb-{compact}.sqlite3'
+            conn = sqlite3.connect(path)
+            conn.execute('PRAGMA page_size = 16384')
+            create_tables(conn, compact)
+            configure_bulk_load(conn)
+            conn.execute('BEGIN')
+
+            for name, df in tables.items():
+                parquet_path = cls.dir / f'{name}-{compact}.parquet'
+                if compact:
+                    df = df.assign(**{col: df[col].astype('int64') for col in df if col in ('cnpj', 'cnpj_order', 'cnpj_dv', 'cep')})
+                    df.to_parquet(parquet_path, schema=schema[name], index=False)
+                else:
+                    df.to_parquet(parquet_path, index=False)
+
+                insert_parquet(conn, name, parquet_path, pad_keys=not compact, rowid=compact and name != 'companies')
+
+            conn.commit()
+            create_indexes(conn, compact)
+            conn.execute('VACUUM')
+            conn.close()
+
+            cls.sizes[compact] = path.stat().st_size
+            cls.conns[compact] = sqlite3.connect(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        for conn in cls.conns.values():
+            conn.close()
+
+        cls.tmp.cleanup()
+
+    def detail(self, compact, cnpj):
+        conn = self.conns[compact]
+
+        return (
+            conn.execute('SELECT cnpj, corporate_name, capital FROM companies WHERE cnpj = ?', (cnpj,)).fetchall(),
+            conn.execute('SELECT cnpj, name_partner, start_date FROM partners WHERE cnpj = ? ORDER BY rowid', (cnpj,)).fetchall(),
+            conn.execute(
+                'SELECT cnpj, cnpj_order, cnpj_dv, trade_name, opening_date, cep '
+                'FROM business WHERE cnpj = ? ORDER BY cnpj_order, cnpj_dv'       ,
+                (cnpj,)                                                           ,
+            ).fetchall(),
+        )
+
+    def padded(self, result):
+        widths = ([8, None, None], [8, None, None], [8, 4, 2, None, None, 8])
+
+        return tuple(
+            [
+                tuple(
+                    f'{value:0{width}}' if width else value
+                    for value, width in zip(row, table_widths)
+                )
+                for row in rows
+            ]
+            for rows, table_widths in zip(result, widths)
+        )
+
+    def test_compact_schema_matches_text_schema(self):
+        for cnpj in self.cnpjs[:50]:
+            self.assertEqual(self.detail(False, cnpj), self.padded(self.detail(True, cnpj)))
+
+    def test_compact_schema_is_smaller(self):
+        print()
+        print(f"text schema    - Size: {self.sizes[False] / 1024 ** 2:.1f} MB")
+        print(f"compact schema - Size: {self.sizes[True]  / 1024 ** 2:.1f} MB")
+
+        self.assertLess(self.sizes[True], self.sizes[False] * 0.85)
+
+    def test_detail_lookups_read_primary_key(self):
+        plan = self.conns[True].execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM partners WHERE cnpj = ?', ('00000001',)
+        ).fetchall()
+        self.assertIn('USING PRIMARY KEY (cnpj=?)', plan[0][-1])
+
+        for compact in (False, True):
+            start = time.perf_counter()
+            for cnpj in self.cnpjs:
+                self.detail(compact, cnpj)
+            elapsed = time.perf_counter() - start
+
+            print()
+            print(f"{'compact' if compact else 'text'} schema - {len(self.cnpjs)} detail lookups: {elapsed:.4f} seconds")
+
+
+class TestDuckDBLoad(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.dir = Path(cls.tmp.name)
+
+        rng      = np.random.default_rng(2)
+        business = make_business(200_000).drop_duplicates(['cnpj', 'cnpj_order', 'cnpj_dv'])
+        partners = pd.DataFrame({
+            'cnpj'        : rng.choice(business['cnpj'], 200_000)                     ,
+            'name_partner': rng.choice(['MARIA SOUZA', 'JOSÉ SANTOS'], 200_000)        ,
+            'start_date'  : pd.to_datetime('2000-01-01') + pd.to_timedelta(rng.integers(0, 9_000, 200_000), unit='D'),
+        })
+
+        partners.to_parquet(cls.dir / 'partners.parquet', engine='fastparquet', index=False, row_group_offsets=50_000)
+
+        compact = business.assign(**{
+            col: business[col].astype('int64')
+            for col in ('cnpj', 'cnpj_order', 'cnpj_dv', 'cep')
+        })
+        table = pa.Table.from_pandas(compact, schema=SCHEMA_BUSINESS, preserve_index=False)
+        pq.write_to_dataset(
+            table.append_column('cnpj_prefix', pa.array(compact['cnpj'] // 1_000_000, pa.int32())),
+            cls.dir / 'business'         ,
+            partition_cols=['cnpj_prefix'],
+        )
+        write_dataset_metadata(cls.dir / 'business')
+
+        cls.sqlite = sqlite3.connect(':memory:')
+        insert_parquet(cls.sqlite, 'partners', cls.dir / 'partners.parquet')
+        insert_parquet(cls.sqlite, 'business', cls.dir / 'business.parquet')
+
+        cls.duckdb = duckdb.connect()
+        load_duckdb_table(cls.duckdb, 'partners', cls.dir / 'partners.parquet')
+        load_duckdb_table(cls.duckdb, 'business', cls.dir / 'business.parquet')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sqlite.close()
+        cls.duckdb.close()
+        cls.tmp.cleanup()
+
+    def types(self, table):
+        return {
+            name: column_type
+            for name, column_type, *_ in self.duckdb.execute(f'DESCRIBE {table}').fetchall()
+        }
+
+    def test_tables_are_typed(self):
+        business = self.types('business')
+
+        self.assertEqual(business['cnpj']        , 'VARCHAR')
+        self.assertEqual(business['branch']      , 'BOOLEAN')
+        self.assertEqual(business['opening_date'], 'DATE'   )
+        self.assertEqual(self.types('partners')['start_date'], 'DATE')
+
+    def test_rows_match_sqlite_load(self):
+        for table in ('partners', 'business'):
+            expected = sorted(
+                self.sqlite.execute(f'SELECT * FROM {table}').fetchall(),
+                key=str,
+            )
+            result = sorted(
+                (
+                    tuple(
+                        value.isoformat() if hasattr(value, 'isoformat') else
+                        int(value)        if isinstance(value, bool)     else value
+                        for value in row
+                    )
+                    for row in self.duckdb.execute(f'SELECT * FROM {table}').fetchall()
+                ),
+                key=str,
+            )
+
+            self.assertEqual(expected, result)
+
+    def test_rows_are_clustered_on_dates(self):
+        for table, column in (('partners', 'start_date'), ('business', 'opening_date')):
+            values = [row[0] for row in self.duckdb.execute(f'SELECT {column} FROM {table}').fetchall()]
+            self.assertEqual(values, sorted(values))
+
+        self.duckdb.execute(
+            f"CREATE TABLE unordered AS SELECT * FROM read_parquet('{(self.dir / 'business').as_posix()}/**/*.parquet')"
+        )
+
+        query = "SELECT COUNT(*) FROM {} WHERE opening_date >= DATE '2020-01-01' AND opening_date < DATE '2020-02-01'"
+        for table in ('unordered', 'business'):
+            start = time.perf_counter()
+            for _ in range(20):
+                self.duckdb.execute(query.format(table)).fetchone()
+            print()
+            print(f"{table:<9} - opening_date range scan: {(time.perf_counter() - start) / 20 * 1000:.3f} ms")
+
+        self.duckdb.execute('DROP TABLE unordered')
+
+
+class TestDashboardAggregates(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.duckdb = duckdb.connect()
+        cls.duckdb.execute("""
+            CREATE TABLE companies AS
+            SELECT * FROM (VALUES
+                ('01', 0   ),
+                ('02', 5   ),
+                ('03', 50  ),
+                ('04', 150 ),
+                ('05', 2500),
+                ('06', NULL),
+                ('07', NULL)
+            ) AS companies (cnpj, capital)
+        """)
+        cls.duckdb.execute("""
+            CREATE TABLE business AS
+            SELECT * FROM (VALUES
+                ('01', DATE '2001-03-04', NULL             , '01310100'),
+                ('01', DATE '2001-07-01', DATE '2010-01-01', '01310200'),
+                ('02', DATE '2005-01-01', NULL             , '20040000'),
+                ('03', DATE '2005-06-30', NULL             , '20040100'),
+                ('04', DATE '2010-12-31', DATE '2015-01-01', '30110000')
+            ) AS business (cnpj, opening_date, closing_date, cep)
+        """)
+        cls.duckdb.execute("""
+            CREATE TABLE partners AS
+            SELECT * FROM (VALUES ('01'), ('01'), ('02'), ('99')) AS partners (cnpj)
+            UNION ALL
+            SELECT '03' FROM range(12)
+        """)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.duckdb.close()
+
+    def analytics(self):
+        [row] = self.duckdb.execute(ANALYTICS_QUERY).fetchall()
+
+        return dict(zip(ANALYTICS_COLUMNS, row))
+
+    def test_capital_excludes_nulls(self):
+        analytics = self.analytics()
+
+        self.assertEqual(analytics['capital_histogram'], {0: 2, 1: 1, 2: 1, 3: 1})
+        self.assertEqual(analytics['null_capital']     , 2                      )
+
+        for actual, expected in zip(analytics['capital_quantiles'], [2, 5, 50, 150, 1560, 2406]):
+            self.assertAlmostEqual(actual, expected)
+
+    def test_business_aggregates(self):
+        analytics = self.analytics()
+
+        self.assertEqual(analytics['opened_per_year'], {2001: 2, 2005: 2, 2010: 1}    )
+        self.assertEqual(analytics['active_business'], 3                              )
+        self.assertEqual(analytics['closed_business'], 2                              )
+        self.assertEqual(analytics['cep_prefixes']   , {'013': 2, '200': 2, '301': 1})
+
+    def test_partner_distribution_counts_companies_without_partners(self):
+        self.assertEqual(
+            self.analytics()['partner_distribution'],
+            {0: 4, 1: 1, 2: 1, PARTNERS_CAP: 1}     ,
+        )
+
+    def test_materialised_table_matches_query(self):
+        build_aggregates(self.duckdb, {'dashboard_analytics': ANALYTICS_QUERY})
+
+        self.assertEqual(
+            self.duckdb.execute(f"SELECT {', '.join(ANALYTICS_COLUMNS)} FROM dashboard_analytics").fetchall(),
+            self.duckdb.execute(ANALYTICS_QUERY).fetchall()                                                 ,
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,806 @@
+import time
+import duckdb
+import random
+import sqlite3
+import zipfile
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from pathlib       import Path
+from unittest.mock import patch
+
+from scripts.process    import csv2parquet         , \
+                               csv2parquet_parallel, \
+                               read_chunks         , \
+                               read_chunks_arrow   , \
+                               dedupe_parquet      , \
+                               ChunkSizer          , \
+                               PEAK_RSS            , \
+                               clear_timings       , \
+                               verify_bloom_filters
+from scripts.transforms import fn_partners    , \
+                               fn_companies   , \
+                               fn_business    , \
+                               has_partner    , \
+                               zfill_digits   , \
+                               parse_yyyymmdd , \
+                               clean_cep      , \
+                               is_headquarters, \
+                               pad_keys       , \
+                               PARTITIONS_PARTNERS
+from scripts.load       import insert_parquet
+from scripts.manifest   import load_manifest
+from scripts.constants import COLS_PARTNERS  , \
+                              COLS_COMPANIES , \
+                              NAMES_COMPANIES, \
+                              COLS_BUSINESS  , \
+                              NAMES_PARTNERS , \
+                              NAMES_BUSINESS , \
+                              SORT_PARTNERS  , \
+                              SORT_BUSINESS  , \
+                              SCHEMA_PARTNERS
+
+
+NAMES = [
+    'JOÃO DA SILVA' ,
+    'MARIA DE SOUZA',
+    'JOSÉ ALMEIDA'  ,
+    'ANA CONCEIÇÃO' ,
+    'PEDRO ÁLVARES' ,
+]
+
+
+def make_socios(path, nrows, seed=0):
+    rng = random.Random(seed)
+
+    with open(path, 'w', encoding='latin-1', newline='') as f:
+        for _ in range(nrows):
+            cnpj = rng.randint(0, 99_999_999)
+            date = f'{rng.randint(1990, 2024)}{rng.randint(1, 12):02}{rng.randint(1, 28):02}'
+
+            row = [
+                f'{cnpj}'        ,
+                '2'              ,
+                rng.choice(NAMES),
+                '***123456**'    ,
+                '49'             ,
+                date             ,
+                ''               ,
+                '***000000**'    ,
+                ''               ,
+                '00'             ,
+                '5'              ,
+            ]
+            f.write(';'.join(f'"{v}"' for v in row) + '\n')
+
+
+def make_estabelecimentos(path, nrows, seed=0):
+    rng = random.Random(seed)
+
+    with open(path, 'w', encoding='latin-1', newline='') as f:
+        for _ in range(nrows):
+            row = [''] * 30
+
+            row[0]  = f'{rng.randint(0, 2_000):08}'
+            row[1]  = f'{rng.randint(1, 9_999):04}'
+            row[2]  = f'{rng.randint(0, 99):02}'
+            row[3]  = rng.choice(['1', '2'])
+            row[4]  = rng.choice(['PADARIA SÃO JOÃO', 'AÇOUGUE', ''])
+            row[6]  = rng.choice(['0', '20051103', f'{rng.randint(1990, 2024)}0{rng.randint(1, 9)}15'])
+            row[10] = f'{rng.randint(1950, 2024)}{rng.randint(1, 12):02}{rng.randint(1, 28):02}'
+            row[18] = rng.choice(['', f'{rng.randint(1_000_000, 99_999_999):08}'])
+
+            f.write(';'.join(f'"{v}"' for v in row) + '\n')
+
+
+def make_empresas(path, nrows, seed=0):
+    rng = random.Random(seed)
+
+    with open(path, 'w', encoding='latin-1', newline='') as f:
+        for _ in range(nrows):
+            row = [
+                f'{rng.randint(0, 600):08}'               ,
+                rng.choice(['PADARIA LTDA', 'AÇOUGUE ME']),
+                '2062'                                    ,
+                '49'                                      ,
+                f'{rng.randint(0, 10_000)},00'            ,
+                '05'                                      ,
+                ''                                        ,
+            ]
+            f.write(';'.join(f'"{v}"' for v in row) + '\n')
+
+
+def make_zip(csv_path, zip_path):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.write(csv_path, arcname=csv_path.stem.upper() + '.CSV')
+
+
+def drop_rows(chunk):
+    return chunk.iloc[:0]
+
+
+class TransformTestBase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+        self.csv_paths = []
+        for i in range(2):
+            path = self.dir / f'socios{i}.csv'
+            make_socios(path, 2_000, seed=i)
+            self.csv_paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_csv2parquet(self, name, file_paths, parallel=False, **kwargs):
+        parquet_path = self.dir / name
+        convert      = csv2parquet_parallel if parallel else csv2parquet
+
+        convert(
+            parquet_path  ,
+            file_paths    ,
+            COLS_PARTNERS ,
+            NAMES_PARTNERS,
+            500           ,
+            **kwargs      ,
+        )
+
+        return pd.read_parquet(parquet_path)
+
+
+class TestZipSource(TransformTestBase):
+    def test_zip_members_match_extracted_csv(self):
+        zip_paths = []
+        for path in self.csv_paths:
+            zip_path = path.with_suffix('.zip')
+            make_zip(path, zip_path)
+            zip_paths.append(zip_path)
+
+        from_csv = self.run_csv2parquet('csv.parquet', self.csv_paths, sort_by=SORT_PARTNERS)
+        from_zip = self.run_csv2parquet('zip.parquet', zip_paths     , sort_by=SORT_PARTNERS)
+
+        self.assertEqual(len(from_csv), 4_000)
+        pd.testing.assert_frame_equal(from_csv, from_zip)
+
+
+class TestExternalSort(TransformTestBase):
+    def test_external_sort_is_globally_ordered(self):
+        chunked  = self.run_csv2parquet('chunk.parquet'   , self.csv_paths, sort_by=SORT_PARTNERS)
+        external = self.run_csv2parquet(
+            'external.parquet'   ,
+            self.csv_paths       ,
+            sort_by=SORT_PARTNERS,
+            sort_mode='external' ,
+            memory_budget=64_000 ,
+        )
+
+        expected = chunked.sort_values(SORT_PARTNERS, kind='stable', ignore_index=True)
+        pd.testing.assert_frame_equal(
+            external[SORT_PARTNERS],
+            expected[SORT_PARTNERS],
+        )
+        self.assertEqual(sorted(map(tuple, external.values)), sorted(map(tuple, chunked.values)))
+
+        meta = pq.ParquetFile(self.dir / 'external.parquet').metadata
+        self.assertGreater(meta.num_row_groups, 1)
+
+        bounds = [
+            (stats.min, stats.max)
+            for stats in (
+                meta.row_group(i).column(2).statistics
+                for i in range(meta.num_row_groups)
+            )
+        ]
+        for (_, prev_max), (next_min, _) in zip(bounds, bounds[1:]):
+            self.assertLessEqual(prev_max, next_min)
+
+        self.assertFalse((self.dir / 'external.spill').exists())
+
+
+class TestParallelTransform(TransformTestBase):
+    def test_parallel_parts_match_serial_output(self):
+        serial   = self.run_csv2parquet('serial.parquet', self.csv_paths, transform=fn_partners)
+        parallel = self.run_csv2parquet(
+            'parallel.parquet'   ,
+            self.csv_paths       ,
+            parallel=True        ,
+            workers=2            ,
+            transform=fn_partners,
+        )
+
+        pd.testing.assert_frame_equal(serial, parallel)
+        self.assertFalse((self.dir / 'parallel.parts').exists())
+
+    def test_parallel_external_sort_is_globally_ordered(self):
+        parallel = self.run_csv2parquet(
+            'parallel.parquet'   ,
+            self.csv_paths       ,
+            parallel=True        ,
+            workers=2            ,
+            transform=fn_partners,
+            sort_by=SORT_PARTNERS,
+            sort_mode='external' ,
+        )
+
+        self.assertEqual(len(parallel), 4_000)
+        self.assertTrue(
+            parallel
+            .start_date
+            .is_monotonic_increasing
+        )
+
+
+class TestEmptyInput(TransformTestBase):
+    def setUp(self):
+        super().setUp()
+
+        self.empty_path = self.dir / 'empty.csv'
+        self.empty_path.touch()
+
+    def test_empty_input_writes_empty_file(self):
+        for name, kwargs in [
+            ('chunk.parquet'   , {})                                                                  ,
+            ('external.parquet', {'sort_by': SORT_PARTNERS, 'sort_mode': 'external'})                 ,
+            ('parallel.parquet', {'parallel': True, 'workers': 2})                                    ,
+            ('merged.parquet'  , {'parallel': True, 'sort_by': SORT_PARTNERS, 'sort_mode': 'external'}),
+            ('resumed.parquet' , {'checkpoint': True})                                                ,
+        ]:
+            with self.subTest(name):
+                df = self.run_csv2parquet(name, [self.empty_path, self.empty_path], **kwargs)
+
+                self.assertTrue(df.empty)
+                self.assertEqual(list(df.columns), NAMES_PARTNERS)
+
+    def test_filtered_out_rows_write_schema(self):
+        df = self.run_csv2parquet(
+            'filtered.parquet'    ,
+            self.csv_paths        ,
+            parallel=True         ,
+            transform=drop_rows   ,
+            sort_by=SORT_PARTNERS ,
+            sort_mode='external'  ,
+            schema=SCHEMA_PARTNERS,
+        )
+
+        self.assertTrue(df.empty)
+        self.assertEqual(pq.read_schema(self.dir / 'filtered.parquet'), SCHEMA_PARTNERS)
+
+
+class TestArrowEngine(TransformTestBase):
+    def test_arrow_engine_matches_pandas_engine(self):
+        timings = {}
+
+        for engine in ('pandas', 'arrow'):
+            start = time.perf_counter()
+            timings[engine] = self.run_csv2parquet(
+                f'{engine}.parquet'  ,
+                self.csv_paths       ,
+                transform=fn_partners,
+                sort_by=SORT_PARTNERS,
+                engine=engine        ,
+            ), time.perf_counter() - start
+
+        (expected, t_pandas), (result, t_arrow) = timings['pandas'], timings['arrow']
+
+        print()
+        print(f"pandas engine - Execution time: {t_pandas:.6f} seconds")
+        print(f"arrow  engine - Execution time: {t_arrow :.6f} seconds")
+
+        pd.testing.assert_frame_equal(expected, result)
+
+    def test_arrow_engine_keeps_rows_with_mismatched_field_count(self):
+        csv_path = self.dir / 'ragged.csv'
+        lines    = self.csv_paths[0].read_text(encoding='latin-1').splitlines()
+
+        lines[10] = ';'.join(lines[10].split(';')[:3])
+        lines[15] = ';'.join(lines[15].split(';')[:6])
+        lines[20] = lines[20] + ';"EXTRA"'
+        csv_path.write_text('\n'.join(lines) + '\n', encoding='latin-1')
+
+        frames = {
+            engine: self.run_csv2parquet(f'ragged-{engine}.parquet', [csv_path], transform=fn_partners, engine=engine)
+            for engine in ('pandas', 'arrow')
+        }
+
+        self.assertEqual(len(frames['arrow']), 1_999)
+        pd.testing.assert_frame_equal(
+            frames['pandas'].sort_values(NAMES_PARTNERS, ignore_index=True),
+            frames['arrow' ].sort_values(NAMES_PARTNERS, ignore_index=True),
+        )
+
+    def test_arrow_engine_keeps_recovered_rows_in_source_order(self):
+        csv_path = self.dir / 'ragged.csv'
+        lines    = self.csv_paths[0].read_text(encoding='latin-1').splitlines()
+
+        for i in (1, 37, 38, 250, 999, 1_999):
+            lines[i] = ';'.join(lines[i].split(';')[:6])
+        for i in (120, 777):
+            lines[i] = lines[i] + ';"EXTRA"'
+        csv_path.write_text('\n'.join(lines) + '\n', encoding='latin-1')
+
+        expected = pd.concat(
+            map(fn_partners, read_chunks([csv_path], COLS_PARTNERS, NAMES_PARTNERS, 300)),
+            ignore_index=True                                                           ,
+        )
+        result   = pd.concat(
+            map(fn_partners, read_chunks_arrow([csv_path], COLS_PARTNERS, NAMES_PARTNERS, 300, block_size=16*1024)),
+            ignore_index=True                                                                                     ,
+        )
+
+        self.assertEqual(len(result), 2_000)
+        pd.testing.assert_frame_equal(expected, result)
+
+    def test_arrow_engine_matches_pandas_engine_for_business(self):
+        csv_path      = self.dir / 'estabelecimentos0.csv'
+        partners_path = self.dir / 'partners.parquet'
+
+        make_estabelecimentos(csv_path, 3_000)
+        pd.DataFrame({'cnpj': [f'{i:08}' for i in range(0, 2_000, 3)]}).to_parquet(partners_path)
+
+        frames = {}
+        with patch('scripts.transforms.PARQUET_PARTNERS', partners_path):
+            for engine in ('pandas', 'arrow'):
+                csv2parquet(
+                    self.dir / f'{engine}.parquet',
+                    [csv_path]                    ,
+                    COLS_BUSINESS                 ,
+                    NAMES_BUSINESS                ,
+                    700                           ,
+                    transform=fn_business         ,
+                    sort_by=SORT_BUSINESS         ,
+                    engine=engine                 ,
+                )
+                frames[engine] = pd.read_parquet(self.dir / f'{engine}.parquet')
+
+        self.assertGreater(len(frames['pandas']), 0)
+        pd.testing.assert_frame_equal(frames['pandas'], frames['arrow'])
+
+
+class TestCompactSchema(TransformTestBase):
+    def test_compact_schema_round_trips_through_loader(self):
+        default = self.run_csv2parquet('default.parquet', self.csv_paths, transform=fn_partners, sort_by=SORT_PARTNERS)
+        compact = self.run_csv2parquet(
+            'compact.parquet'     ,
+            self.csv_paths        ,
+            transform=fn_partners ,
+            sort_by=SORT_PARTNERS ,
+            schema=SCHEMA_PARTNERS,
+        )
+
+        self.assertEqual(pq.read_schema(self.dir / 'compact.parquet'), SCHEMA_PARTNERS)
+        self.assertLess(
+            (self.dir / 'compact.parquet').stat().st_size,
+            (self.dir / 'default.parquet').stat().st_size,
+        )
+
+        compact = pad_keys(compact)
+        compact.name_partner = compact.name_partner.astype(str)
+        compact.start_date   = compact.start_date.astype('datetime64[ns]')
+        pd.testing.assert_frame_equal(default, compact)
+
+        rows = {}
+        for name in ('default', 'compact'):
+            conn = sqlite3.connect(':memory:')
+            insert_parquet(conn, 'partners', self.dir / f'{name}.parquet')
+            rows[name] = conn.execute('SELECT * FROM partners').fetchall()
+            conn.close()
+
+        self.assertEqual(rows['default'], rows['compact'])
+
+
+class TestPartitionedDataset(TransformTestBase):
+    def read_dataset(self, name, **kwargs):
+        return pq.read_table(self.dir / name, **kwargs).to_pandas()
+
+    def test_partitioned_dataset_matches_single_file(self):
+        single = self.run_csv2parquet('single.parquet', self.csv_paths, transform=fn_partners)
+
+        for name, parallel in (('serial', False), ('parallel', True)):
+            kwargs  = {'workers': 2} if parallel else {}
+            convert = csv2parquet_parallel if parallel else csv2parquet
+
+            convert(
+                self.dir / name               ,
+                self.csv_paths                ,
+                COLS_PARTNERS                 ,
+                NAMES_PARTNERS                ,
+                500                           ,
+                transform=fn_partners         ,
+                partitions=PARTITIONS_PARTNERS,
+                **kwargs                      ,
+            )
+
+            root = self.dir / name
+            self.assertTrue((root / '_metadata').exists())
+            self.assertTrue((root / '_common_metadata').exists())
+            self.assertEqual(
+                {path.name for path in root.iterdir() if path.is_dir()},
+                {f'start_year={year}' for year in single.start_date.dt.year.unique()},
+            )
+
+            dataset = self.read_dataset(name).drop(columns='start_year')
+            pd.testing.assert_frame_equal(
+                dataset.sort_values(NAMES_PARTNERS, ignore_index=True),
+                single .sort_values(NAMES_PARTNERS, ignore_index=True),
+            )
+
+        pruned = self.read_dataset('serial', filters=[('start_year', '=', 2020)])
+        self.assertEqual(len(pruned), (single.start_date.dt.year == 2020).sum())
+        self.assertTrue((pruned.start_date.dt.year == 2020).all())
+
+        rows = {}
+        for name in ('single.parquet', 'serial'):
+            conn = sqlite3.connect(':memory:')
+            insert_parquet(conn, 'partners', self.dir / name)
+            rows[name] = sorted(conn.execute('SELECT * FROM partners').fetchall())
+            conn.close()
+
+        self.assertEqual(rows['single.parquet'], rows['serial'])
+
+
+class TestWriterOptions(TransformTestBase):
+    OPTIONS = {
+        'row_group_size': 5_000,
+        'page_index'    : True ,
+    }
+    BLOOM_OPTIONS = {
+        'row_group_size': 5_000    ,
+        'bloom_filters' : ('cnpj',),
+    }
+
+    def setUp(self):
+        super().setUp()
+
+        self.large_paths = []
+        for i in range(2):
+            path = self.dir / f'large{i}.csv'
+            make_socios(path, 50_000, seed=10 + i)
+            self.large_paths.append(path)
+
+    def convert(self, name, **kwargs):
+        csv2parquet(
+            self.dir / name      ,
+            self.large_paths     ,
+            COLS_PARTNERS        ,
+            NAMES_PARTNERS       ,
+            25_000               ,
+            transform=fn_partners,
+            sort_by=SORT_PARTNERS,
+            **kwargs             ,
+        )
+
+        return self.dir / name
+
+    def lookup(self, query, cnpjs):
+        start = time.perf_counter()
+        rows  = [
+            sorted(tuple(row.values()) for row in query(cnpj))
+            for cnpj in cnpjs
+        ]
+
+        return rows, (time.perf_counter() - start) / len(cnpjs)
+
+    def test_tuned_writer_keeps_page_index_and_dictionary_types(self):
+        tuned = self.convert('tuned.parquet', schema=SCHEMA_PARTNERS, writer_options=self.OPTIONS)
+        meta  = pq.ParquetFile(tuned).metadata
+
+        self.assertEqual(pq.read_schema(tuned), SCHEMA_PARTNERS)
+        self.assertEqual(meta.num_row_groups, 20)
+
+        for i in range(meta.num_row_groups):
+            for j in range(meta.num_columns):
+                self.assertTrue(meta.row_group(i).column(j).has_offset_index)
+                self.assertTrue(meta.row_group(i).column(j).has_column_index)
+
+    def test_bloom_writer_adds_cnpj_bloom_filters(self):
+        plain = self.convert('plain.parquet', writer_options=self.OPTIONS      )
+        bloom = self.convert('bloom.parquet', writer_options=self.BLOOM_OPTIONS)
+
+        row_groups = pq.ParquetFile(bloom).metadata.num_row_groups
+        self.assertGreater(row_groups, 1)
+        pd.testing.assert_frame_equal(pd.read_parquet(plain), pd.read_parquet(bloom))
+
+        conn = duckdb.connect()
+
+        def blooms(path):
+            return conn.execute(
+                f"""SELECT count(*)
+                    FROM parquet_metadata('{path}')
+                    WHERE path_in_schema = 'cnpj' AND bloom_filter_offset IS NOT NULL"""
+            ).fetchone()[0]
+
+        self.assertEqual(blooms(plain), 0         )
+        self.assertEqual(blooms(bloom), row_groups)
+
+        def duckdb_query(path):
+            return lambda cnpj: conn.execute(
+                f"SELECT * FROM read_parquet('{path}') WHERE cnpj = ?",
+                [cnpj]                                              ,
+            ).df().to_dict('records')
+
+        cnpjs = pd.read_parquet(plain, columns=['cnpj']).cnpj.sample(50, random_state=0)
+        cnpjs = list(cnpjs) + [f'{i:08}' for i in range(100_000_000 - 50, 100_000_000)]
+
+        timings = {}
+        results = {}
+        for label, path in (('page index  ', plain), ('bloom filter', bloom)):
+            results[label], timings[label] = self.lookup(duckdb_query(path), cnpjs)
+
+        conn.close()
+
+        print()
+        for label, seconds in timings.items():
+            print(f"{label} (duckdb) - Point lookup: {seconds * 1000:.3f} ms")
+
+        self.assertEqual(results['page index  '], results['bloom filter'])
+
+    def test_bloom_filters_are_verified_after_writing(self):
+        plain = self.convert('plain.parquet', writer_options=self.OPTIONS)
+
+        with self.assertRaises(RuntimeError):
+            verify_bloom_filters(plain, ('cnpj',))
+
+    def test_bloom_writer_keeps_dictionary_types(self):
+        bloom = self.convert('compact.parquet', schema=SCHEMA_PARTNERS, writer_options=self.BLOOM_OPTIONS)
+
+        self.assertEqual(pq.read_schema(bloom), SCHEMA_PARTNERS)
+        self.assertEqual(pq.read_table(bloom).num_rows, 100_000)
+
+    def test_bloom_writer_writes_partitioned_datasets(self):
+        default = self.convert('default.parquet')
+        bloom   = self.convert('bloom', partitions=PARTITIONS_PARTNERS, writer_options=self.BLOOM_OPTIONS)
+
+        dataset = pq.read_table(bloom).to_pandas()[NAMES_PARTNERS]
+        self.assertEqual(
+            sorted(map(tuple, dataset.astype(str).values))                 ,
+            sorted(map(tuple, pd.read_parquet(default).astype(str).values)),
+        )
+        self.assertTrue((bloom / '_metadata').exists())
+
+    def test_page_index_and_bloom_filters_are_exclusive(self):
+        with self.assertRaises(ValueError):
+            self.convert('both.parquet', writer_options={**self.OPTIONS, **self.BLOOM_OPTIONS})
+
+        with self.assertRaises(ValueError):
+            self.convert('missing.parquet', writer_options={**self.BLOOM_OPTIONS, 'bloom_filters': ('cep',)})
+
+
+class TestCheckpointedTransform(TransformTestBase):
+    def test_resumes_at_first_uncommitted_chunk(self):
+        expected = self.run_csv2parquet('expected.parquet', self.csv_paths, transform=fn_partners, checkpoint=True)
+
+        calls = []
+        def crashing(df):
+            calls.append(len(df))
+            if len(calls) == 6:
+                raise RuntimeError('preempted')
+            return fn_partners(df)
+
+        with self.assertRaises(RuntimeError):
+            self.run_csv2parquet('resumed.parquet', self.csv_paths, transform=crashing, checkpoint=True)
+
+        checkpoint_dir = self.dir / 'resumed.checkpoint'
+        run            = load_manifest(checkpoint_dir / 'run.json')
+
+        self.assertFalse((self.dir / 'resumed.parquet').exists())
+        self.assertEqual(run['files'], ['socios0.csv'])
+        self.assertEqual(len(run['chunks']), 5)
+
+        calls.clear()
+        resumed = self.run_csv2parquet('resumed.parquet', self.csv_paths, transform=crashing, checkpoint=True)
+
+        self.assertEqual(len(calls), 3)
+        self.assertFalse(checkpoint_dir.exists())
+        pd.testing.assert_frame_equal(expected, resumed)
+
+
+class TestAdaptiveChunks(TransformTestBase):
+    def test_chunks_follow_memory_budget(self):
+        expected = self.run_csv2parquet('fixed.parquet', self.csv_paths, transform=fn_partners)
+
+        for engine in ('pandas', 'arrow'):
+            counts = []
+
+            for budget in (200_000, 2_000_000):
+                sizes = []
+                sizer = ChunkSizer(budget, initial_rows=100, min_rows=10)
+                clear_timings()
+
+                def transform(df):
+                    sizes.append(len(df))
+                    return fn_partners(df)
+
+                csv2parquet(
+                    self.dir / f'{engine}-{budget}.parquet',
+                    self.csv_paths                         ,
+                    COLS_PARTNERS                          ,
+                    NAMES_PARTNERS                         ,
+                    sizer                                  ,
+                    transform=transform                    ,
+                    engine=engine                          ,
+                )
+
+                self.assertEqual(sizes[0], 100)
+                self.assertEqual(sizer.rows, int(budget // (sizer.row_bytes * sizer.overhead)))
+                self.assertGreater(PEAK_RSS['read'], 0)
+                counts.append(len(sizes))
+
+                result = pd.read_parquet(self.dir / f'{engine}-{budget}.parquet')
+                pd.testing.assert_frame_equal(expected, result)
+
+            self.assertGreater(counts[0], counts[1])
+
+
+class TestCompanyDedupe(TransformTestBase):
+    def test_companies_are_unique_and_sorted_by_cnpj(self):
+        csv_paths     = []
+        partners_path = self.dir / 'partners.parquet'
+
+        for i in range(2):
+            path = self.dir / f'empresas{i}.csv'
+            make_empresas(path, 1_500, seed=i)
+            csv_paths.append(path)
+
+        pd.DataFrame({'cnpj': [f'{i:08}' for i in range(0, 600, 2)]}).to_parquet(partners_path)
+
+        with patch('scripts.transforms.PARQUET_PARTNERS', partners_path):
+            csv2parquet(
+                self.dir / 'companies.parquet',
+                csv_paths                     ,
+                COLS_COMPANIES                ,
+                NAMES_COMPANIES               ,
+                500                           ,
+                transform=fn_companies        ,
+            )
+            with_duplicates = pd.read_parquet(self.dir / 'companies.parquet')
+
+            dedupe_parquet(self.dir / 'companies.parquet', 'cnpj', digits=1)
+            result = pd.read_parquet(self.dir / 'companies.parquet')
+
+        self.assertGreater(with_duplicates.cnpj.duplicated().sum(), 0)
+        self.assertTrue(result.cnpj.is_unique)
+        self.assertTrue(result.cnpj.is_monotonic_increasing)
+        self.assertFalse((self.dir / 'companies.dedupe').exists())
+
+        expected = with_duplicates.drop_duplicates('cnpj').sort_values('cnpj', ignore_index=True)
+        pd.testing.assert_frame_equal(expected, result)
+
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE companies (cnpj TEXT PRIMARY KEY, corporate_name TEXT, capital INTEGER)')
+        insert_parquet(conn, 'companies', self.dir / 'companies.parquet')
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM companies').fetchone()[0], len(expected))
+        conn.close()
+
+
+    def test_output_is_published_only_after_dedupe(self):
+        source = self.dir / 'companies.undeduped.parquet'
+        output = self.dir / 'companies.parquet'
+
+        pd.DataFrame({'cnpj': [f'{i % 7:08}' for i in range(50)], 'capital': range(50)}).to_parquet(source)
+
+        with patch('scripts.process.write_chunk', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                dedupe_parquet(source, 'cnpj', output_path=output)
+
+        self.assertFalse(output.exists())
+        self.assertEqual(len(pd.read_parquet(source)), 50)
+
+        dedupe_parquet(source, 'cnpj', output_path=output)
+
+        self.assertEqual(pd.read_parquet(output).cnpj.tolist(), [f'{i:08}' for i in range(7)])
+        self.assertFalse((self.dir / 'companies.undeduped.dedupe').exists())
+
+
+def legacy_zfill(series, width):
+    return series.astype(str).str.zfill(width)
+
+
+def legacy_date(series):
+    return pd.to_datetime(series.astype(str), format="%Y%m%d", errors="coerce")
+
+
+def legacy_cep(series):
+    return (
+        series
+        .fillna('0')
+        .astype(str)
+        .str.replace('-' , '')
+        .str.replace(r'\..*$', '', regex=True)
+        .str.zfill(8)
+    )
+
+
+def legacy_branch(series):
+    return series.astype(str).str.strip() == '1'
+
+
+class TestCleaningKernels(unittest.TestCase):
+    ROWS = 200_000
+
+    def setUp(self):
+        rng   = np.random.default_rng(0)
+        dates = rng.integers(1950, 2025, self.ROWS) * 10_000 + \
+                rng.integers(1, 13  , self.ROWS) * 100    + \
+                rng.integers(1, 32  , self.ROWS)
+        dates[::7] = 0
+
+        self.ints = {
+            'cnpj'  : pd.Series(rng.integers(0, 99_999_999, self.ROWS), index=np.arange(self.ROWS) * 2),
+            'dates' : pd.Series(dates)                                                                 ,
+            'cep'   : pd.Series(rng.integers(1_000_000, 99_999_999, self.ROWS))                        ,
+            'branch': pd.Series(rng.integers(1, 3, self.ROWS))                                         ,
+        }
+        self.strs = {
+            name: series.astype(str)
+            for name, series in self.ints.items()
+        }
+        self.strs['cep'] = self.strs['cep'].str.slice(0, 5) + '-' + self.strs['cep'].str.slice(5)
+
+    def compare(self, label, legacy, kernel, series):
+        start    = time.perf_counter()
+        expected = legacy(series)
+        t_legacy = time.perf_counter() - start
+
+        start    = time.perf_counter()
+        result   = kernel(series)
+        t_kernel = time.perf_counter() - start
+
+        print()
+        print(f"{label:<16} legacy - Execution time: {t_legacy:.6f} seconds")
+        print(f"{label:<16} kernel - Execution time: {t_kernel:.6f} seconds")
+        print(f"{label:<16} kernel is {t_legacy / t_kernel:.2f}x faster")
+
+        if isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(expected, result, check_names=False)
+        else:
+            np.testing.assert_array_equal(expected, result)
+
+    def test_zfill_matches_legacy(self):
+        for kind in ('ints', 'strs'):
+            series = getattr(self, kind)['cnpj']
+            self.compare(f'zfill ({kind})', lambda s: legacy_zfill(s, 8), lambda s: zfill_digits(s, 8), series)
+
+    def test_dates_match_legacy(self):
+        for kind in ('ints', 'strs'):
+            series = getattr(self, kind)['dates']
+            self.compare(f'date ({kind})', legacy_date, parse_yyyymmdd, series)
+
+    def test_cep_matches_legacy(self):
+        series = self.ints['cep'].astype('float64')
+        series[::5] = np.nan
+
+        self.compare('cep (floats)', legacy_cep, clean_cep, series)
+        self.compare('cep (strs)', legacy_cep, clean_cep, self.strs['cep'])
+
+    def test_branch_matches_legacy(self):
+        for kind in ('ints', 'strs'):
+            series = getattr(self, kind)['branch']
+            self.compare(f'branch ({kind})', legacy_branch, is_headquarters, series)
+
+
+class TestPartnerSet(TransformTestBase):
+    def test_partner_set_is_built_once_and_probed_per_chunk(self):
+        partners_path = self.dir / 'partners.parquet'
+        pd.DataFrame({'cnpj': ['00000001', '00012345', '99999999']}).to_parquet(partners_path)
+
+        chunks = [
+            pd.Series([1, 2, 12345]),
+            pd.Series([99999999, 0, 100000000]),
+        ]
+
+        with patch('scripts.transforms.pq.read_table', wraps=pq.read_table) as read_table:
+            masks = [
+                has_partner(chunk, partners_path).tolist()
+                for chunk in chunks
+            ]
+
+        self.assertEqual(read_table.call_count, 1)
+        self.assertEqual(masks, [[True, False, True], [True, False, False]])
+
+
+if __name__ == '__main__':
+    unittest.main()